@@ -0,0 +1,55 @@
+"""
+Convert the dashboard source files from CSV to Parquet.
+
+The Streamlit dashboard only reads the Parquet copies, so this script is run once
+at deployment and again whenever the CSV files are refreshed. Files whose Parquet
+copy is already newer than the CSV are skipped.
+
+Requirements:
+- pandas
+- pyarrow
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+
+# Directory holding the source files (the DATA_DIR of the dashboard)
+DATA_DIR = '/home/ubuntu/food_delivery_data'
+
+# Source files read by the dashboard
+SOURCES = ['UberEats_restaurants', 'orders', 'delivery_data', 'promotions']
+
+def convert(name, data_dir=DATA_DIR):
+    """Write the Parquet copy of one CSV file if it is missing or out of date"""
+    csv_path = os.path.join(data_dir, f"{name}.csv")
+    parquet_path = os.path.join(data_dir, f"{name}.parquet")
+    if not os.path.exists(csv_path):
+        print(f"Skipping {name}: {csv_path} not found")
+        return
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        print(f"Skipping {name}: Parquet copy is up to date")
+        return
+
+    # Written to a temporary file next to the target and renamed into place, so a
+    # running dashboard never reads a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=data_dir, prefix=f".{name}.", suffix='.parquet')
+    os.close(fd)
+    try:
+        pd.read_csv(csv_path).to_parquet(tmp_path, compression='zstd')
+        # mkstemp creates the file owner-only; publish it with the permissions a
+        # normally created file gets, so the dashboard's service user can read it
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print(f"Converted {csv_path} to {parquet_path}")
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    for name in SOURCES:
+        convert(name, data_dir)
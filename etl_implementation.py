@@ -12,16 +12,25 @@ The ETL process includes:
 5. Setup for incremental loads using Snowflake streams and tasks
 
 Requirements:
-- snowflake-connector-python
+- snowflake-connector-python[pandas]
 - pandas
+- pyarrow
 """
 
+import io
 import os
+import csv
+import tempfile
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import snowflake.connector
 from datetime import datetime
+import time
 import logging
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Union
 
 # Configure logging
 logging.basicConfig(
@@ -57,12 +66,223 @@ DATA_FILES = {
     "delivery": os.path.join(DATA_DIR, "delivery_data.csv")
 }
 
+# Stage tables loaded from the raw files: (data file key, stage table, source system)
+STAGE_TABLES = [
+    ("restaurants", "STG_RESTAURANTS", "UberEats"),
+    ("products", "STG_PRODUCTS", "Internal"),
+    ("promotions", "STG_PROMOTIONS", "Internal"),
+    ("customers", "STG_CUSTOMERS", "Internal"),
+    ("orders", "STG_ORDERS", "Internal"),
+    ("order_items", "STG_ORDER_ITEMS", "Internal"),
+    ("delivery", "STG_DELIVERY", "Internal")
+]
+
+# Stage loads that still go through pandas; the restaurant feed is where the
+# Zomato field mapping will be applied. All other files are copied as-is.
+DATAFRAME_STAGE_KEYS = {"restaurants"}
+
+# Column types pushed down to the CSV reader for files parsed in Python;
+# columns that are not listed are inferred
+SCHEMAS = {
+    "restaurants": pa.schema([
+        ("loc_number", pa.string()),
+        ("loc_name", pa.string()),
+        ("cuisines", pa.string()),
+        ("address", pa.string()),
+        ("searched_city", pa.string()),
+        ("searched_state", pa.string()),
+        ("searched_zipcode", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("phone", pa.string())
+    ])
+}
+
+# Low-cardinality string columns dictionary-encoded while parsing the files
+# above; the Parquet chunks keep the encoding, so fewer bytes are uploaded
+CATEGORICAL_COLS = {
+    "restaurants": ["cuisines", "searched_city", "searched_state"]
+}
+
+# Range covered by the generated date dimension (5 years of dates)
+DATE_DIMENSION_START = "2020-01-01"
+DATE_DIMENSION_DAYS = 1825
+
+# Number of stage tables loaded concurrently, each on its own connection
+STAGE_LOAD_WORKERS = 8
+
+# Target in-memory size of each Parquet chunk uploaded to a stage
+STAGE_CHUNK_BYTES = 100 * 1024 * 1024
+
+# Internal stage the fact loads are unloaded to as Parquet before being COPYed in
+FACT_STAGE = "CONSUMPTION_SCHEMA.FACT_STAGE"
+
+# order_id -> order_sk map of FACT_ORDER, probed by the downstream fact loads instead
+# of FACT_ORDER itself. It is transient rather than temporary because those loads run
+# on other sessions, and it is dropped once the fact loads are done.
+ORDER_SK_MAP = "CONSUMPTION_SCHEMA.ORDER_SK_MAP"
+
+# Warehouse size used for the bulk fact loads, and the size it returns to afterwards
+FACT_LOAD_WAREHOUSE_SIZE = "LARGE"
+DEFAULT_WAREHOUSE_SIZE = "XSMALL"
+
+# Server-side limit on a single statement (or task run), so a long fact load is
+# cancelled by Snowflake rather than held open by the client indefinitely
+STATEMENT_TIMEOUT_SECONDS = 7200
+
+# Attempts made for a query failing with a transient OperationalError, and the base
+# of the exponential backoff between them (5s, then 10s)
+QUERY_RETRY_ATTEMPTS = 3
+QUERY_RETRY_BACKOFF_SECONDS = 5
+
+# Statements that are safe to re-issue after a lost response: reads, and DDL that
+# either has the same effect again or fails outright. DML is never retried, since
+# the server may have committed it before the connection dropped.
+RETRYABLE_STATEMENTS = {"SELECT", "SHOW", "DESCRIBE", "DESC", "SET", "USE", "CREATE", "ALTER", "DROP"}
+
+# SCD2 entities kept up to date by the PROCESS_<ENTITY>_STREAM tasks. Each column is
+# (clean/dimension column, type, expression over the stage stream); the non-key
+# columns are listed in the same order as the dimension's row_hash.
+SCD2_STREAM_TASKS = [
+    {
+        "entity": "restaurant",
+        "stream": "STAGE_SCHEMA.RESTAURANT_STREAM",
+        "clean_table": "CLEAN_SCHEMA.CLEAN_RESTAURANTS",
+        "dim_table": "CONSUMPTION_SCHEMA.DIM_RESTAURANT",
+        "business_key": "restaurant_id",
+        "columns": [
+            ("restaurant_id", "VARCHAR", "loc_number"),
+            ("restaurant_name", "VARCHAR", "loc_name"),
+            ("cuisine_type", "VARCHAR", "cuisines"),
+            ("address", "VARCHAR", "address"),
+            ("city", "VARCHAR", "searched_city"),
+            ("state", "VARCHAR", "searched_state"),
+            ("country", "VARCHAR", "'USA'"),
+            ("postal_code", "VARCHAR", "searched_zipcode"),
+            ("latitude", "FLOAT", "latitude"),
+            ("longitude", "FLOAT", "longitude"),
+            ("phone_number", "VARCHAR", "phone"),
+            ("email", "VARCHAR", "NULL"),
+            ("operating_hours", "VARCHAR", "NULL"),
+        ],
+    },
+    {
+        "entity": "product",
+        "stream": "STAGE_SCHEMA.PRODUCT_STREAM",
+        "clean_table": "CLEAN_SCHEMA.CLEAN_PRODUCTS",
+        "dim_table": "CONSUMPTION_SCHEMA.DIM_PRODUCT",
+        "business_key": "product_id",
+        "columns": [
+            ("product_id", "VARCHAR", "id"),
+            ("restaurant_id", "VARCHAR", "NULL"),
+            ("product_name", "VARCHAR", "name"),
+            ("description", "VARCHAR", "description"),
+            ("category", "VARCHAR", "NULL"),
+            ("price", "FLOAT", "REPLACE(price, '$', '')::FLOAT"),
+            ("cost", "FLOAT", "REPLACE(cost, '$', '')::FLOAT"),
+            ("is_vegetarian", "BOOLEAN", "FALSE"),
+            ("is_vegan", "BOOLEAN", "FALSE"),
+            ("is_gluten_free", "BOOLEAN", "FALSE"),
+            ("calories", "INTEGER", "NULL"),
+            ("preparation_time", "INTEGER", "NULL"),
+        ],
+    },
+    {
+        "entity": "promotion",
+        "stream": "STAGE_SCHEMA.PROMOTION_STREAM",
+        "clean_table": "CLEAN_SCHEMA.CLEAN_PROMOTIONS",
+        "dim_table": "CONSUMPTION_SCHEMA.DIM_PROMOTION",
+        "business_key": "promotion_id",
+        "columns": [
+            ("promotion_id", "VARCHAR", "promotion_id"),
+            ("promotion_name", "VARCHAR", "name"),
+            ("description", "VARCHAR", "description"),
+            ("discount_type", "VARCHAR", "discount_type"),
+            ("discount_value", "FLOAT", "discount_value"),
+            ("start_date", "DATE", "start_date"),
+            ("end_date", "DATE", "end_date"),
+            ("min_order_value", "FLOAT", "min_order_value"),
+            ("max_discount", "FLOAT", "max_discount"),
+            ("restaurant_id", "VARCHAR", "restaurant_id"),
+            ("is_active", "BOOLEAN", "is_active"),
+        ],
+    },
+    {
+        "entity": "customer",
+        "stream": "STAGE_SCHEMA.CUSTOMER_STREAM",
+        "clean_table": "CLEAN_SCHEMA.CLEAN_CUSTOMERS",
+        "dim_table": "CONSUMPTION_SCHEMA.DIM_CUSTOMER",
+        "business_key": "customer_id",
+        "columns": [
+            ("customer_id", "VARCHAR", "id"),
+            ("first_name", "VARCHAR", "first_name"),
+            ("last_name", "VARCHAR", "last_name"),
+            ("email", "VARCHAR", "NULL"),
+            ("phone_number", "VARCHAR", "NULL"),
+            ("address", "VARCHAR", "NULL"),
+            ("city", "VARCHAR", "city"),
+            ("state", "VARCHAR", "NULL"),
+            ("country", "VARCHAR", "NULL"),
+            ("postal_code", "VARCHAR", "NULL"),
+            ("latitude", "FLOAT", "NULL"),
+            ("longitude", "FLOAT", "NULL"),
+            ("referral_customer_id", "VARCHAR", "referral_customer_id"),
+        ],
+    },
+]
+
+# Schema and root of the task graph that runs the in-warehouse pipeline phases
+PIPELINE_TASK_SCHEMA = "STAGE_SCHEMA"
+PIPELINE_ROOT_TASK = f"{PIPELINE_TASK_SCHEMA}.ETL_ROOT"
+
+# dw_created_at of every fact row written by a run of the graph: the original
+# scheduled time of the run, which all of its tasks read the same
+PIPELINE_RUN_TIMESTAMP = (
+    "SYSTEM$TASK_RUNTIME_INFO('CURRENT_TASK_GRAPH_ORIGINAL_SCHEDULED_TIMESTAMP')::TIMESTAMP_LTZ::TIMESTAMP_NTZ"
+)
+
+# How often a triggered run of the task graph is checked for completion, and how
+# long past the summed timeouts of its tasks the run is waited for before giving up
+PIPELINE_POLL_INTERVAL_SECONDS = 30
+PIPELINE_TIMEOUT_MARGIN_SECONDS = 600
+
+def _tag(df: pd.DataFrame, source_system: str, path: str, load_timestamp: datetime) -> pd.DataFrame:
+    """Add the stage metadata columns to a DataFrame in a single assign"""
+    # The constant string columns are stored as one-category Categoricals so each
+    # row only holds an int8 code instead of its own copy of the string
+    codes = np.zeros(len(df), dtype=np.int8)
+    return df.assign(
+        source_system=pd.Categorical.from_codes(codes, [source_system]),
+        source_file=pd.Categorical.from_codes(codes, [os.path.basename(path)]),
+        load_timestamp=load_timestamp
+    )
+
+
+def _sql_string(value: str) -> str:
+    """Quote a value as a Snowflake string literal, escaping backslashes and quotes"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _write_stage_parquet(df: pd.DataFrame, target: Union[str, io.BytesIO]) -> None:
+    """Write a DataFrame as a Parquet file for upload to a stage"""
+    # Snowflake reads Parquet timestamps at microsecond precision at most, so
+    # nanosecond columns (numpy or Arrow-backed) are stored as microseconds
+    df.to_parquet(
+        target,
+        compression="snappy",
+        index=False,
+        coerce_timestamps="us",
+        allow_truncated_timestamps=True
+    )
+
+
 class SnowflakeConnector:
     """Class to handle Snowflake connections and operations"""
     
     def __init__(self, config: Dict[str, str]):
         self.config = config
         self.conn = None
+        self._cursor = None
     
     def connect(self):
         """Establish connection to Snowflake"""
@@ -73,7 +293,8 @@ class SnowflakeConnector:
                 password=self.config["password"],
                 warehouse=self.config["warehouse"],
                 database=self.config["database"],
-                role=self.config["role"]
+                role=self.config["role"],
+                session_parameters={"STATEMENT_TIMEOUT_IN_SECONDS": STATEMENT_TIMEOUT_SECONDS}
             )
             logger.info("Connected to Snowflake successfully")
             return self.conn
@@ -81,14 +302,56 @@ class SnowflakeConnector:
             logger.error(f"Error connecting to Snowflake: {e}")
             raise
     
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
-        """Execute a SQL query and return results"""
-        if not self.conn:
-            self.connect()
+    def _get_cursor(self):
+        """Return the cached plain cursor, reopening it if it was closed"""
+        if self._cursor is None or self._cursor.is_closed():
+            self._cursor = self.conn.cursor()
+        return self._cursor
+    
+    def execute_query(
+        self, query: str, fetch: bool = False, num_statements: int = 1
+    ) -> Union[List[Dict[str, Any]], int]:
+        """Execute a SQL query and return its rows, or the affected row count when fetch is False
+        
+        Set num_statements to send several ';'-separated statements in one request
+        (0 accepts any number); the rows or row count returned are those of the
+        first statement. Transient failures to connect, and transient failures of a
+        single read or DDL statement, are retried with exponential backoff.
+        """
+        words = query.split(None, 1)
+        retryable = num_statements == 1 and bool(words) and words[0].upper() in RETRYABLE_STATEMENTS
         
+        for attempt in range(1, QUERY_RETRY_ATTEMPTS + 1):
+            sent = False
+            try:
+                if not self.conn:
+                    self.connect()
+                sent = True
+                return self._execute_query_once(query, fetch, num_statements)
+            except snowflake.connector.errors.OperationalError as e:
+                if attempt == QUERY_RETRY_ATTEMPTS or (sent and not retryable):
+                    raise
+                delay = QUERY_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"Query attempt {attempt} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+    
+    def _execute_query_once(
+        self, query: str, fetch: bool, num_statements: int
+    ) -> Union[List[Dict[str, Any]], int]:
+        """Execute a SQL query once, logging it if it fails"""
         try:
+            if not fetch:
+                # DML and DDL results are not needed, so skip building a dict per row
+                cursor = self._get_cursor()
+                cursor.execute(query, num_statements=num_statements)
+                rowcount = cursor.rowcount
+                # Later statements only report their errors once their result set is reached
+                while num_statements != 1 and cursor.nextset():
+                    pass
+                return rowcount
+            
             cursor = self.conn.cursor(snowflake.connector.DictCursor)
-            cursor.execute(query)
+            cursor.execute(query, num_statements=num_statements)
             results = cursor.fetchall()
             cursor.close()
             return results
@@ -97,56 +360,172 @@ class SnowflakeConnector:
             logger.error(f"Query: {query}")
             raise
     
+    def execute_script(self, sql: str) -> None:
+        """Execute a ';'-separated script of any number of statements in one request"""
+        # The server splits and runs the whole script in one round trip, so semicolons
+        # inside string literals, comments and $$ blocks are handled by Snowflake's own
+        # parser, unlike conn.execute_string, which sends each statement separately
+        self.execute_query(sql, num_statements=0)
+    
     def execute_file(self, file_path: str) -> None:
         """Execute SQL commands from a file"""
         try:
             with open(file_path, 'r') as f:
                 sql = f.read()
             
-            # Split the SQL file by semicolons to execute multiple statements
-            statements = sql.split(';')
-            for statement in statements:
-                if statement.strip():
-                    self.execute_query(statement)
+            self.execute_script(sql)
             
             logger.info(f"Successfully executed SQL from file: {file_path}")
         except Exception as e:
             logger.error(f"Error executing SQL file {file_path}: {e}")
             raise
     
-    def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, schema: str) -> None:
-        """Load a pandas DataFrame to a Snowflake table"""
+    def _rows_per_chunk(self, df: pd.DataFrame) -> int:
+        """Estimate how many rows of a DataFrame fit in one stage chunk"""
+        row_bytes = df.memory_usage(deep=True).sum() / max(len(df), 1)
+        return max(int(STAGE_CHUNK_BYTES // max(row_bytes, 1)), 1)
+    
+    def put_file_to_stage(self, local_path: str, stage: str) -> None:
+        """Upload a local file to a stage without any client-side parsing"""
+        if not self.conn:
+            self.connect()
+        
+        cursor = self.conn.cursor()
         try:
-            # Create a temporary CSV file
-            temp_file = f"/tmp/{table_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-            df.to_csv(temp_file, index=False, header=True)
+            cursor.execute(f"PUT 'file://{local_path}' @{stage} AUTO_COMPRESS = TRUE PARALLEL = 8")
+        finally:
+            cursor.close()
+    
+    def load_csv_file_to_table(
+        self, local_path: str, table_name: str, schema: str, source_system: str, load_timestamp: datetime
+    ) -> None:
+        """Load a raw CSV file to a table, adding the stage metadata columns in the COPY"""
+        try:
+            # Only the header is read locally, to know how many columns to project
+            with open(local_path, newline='') as f:
+                num_columns = len(next(csv.reader(f)))
             
-            # Create a stage for file upload
             stage_name = f"{schema}.TEMP_STAGE_{table_name}"
             self.execute_query(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
+            self.put_file_to_stage(local_path, stage_name)
             
-            # Upload file to stage
-            cursor = self.conn.cursor()
-            cursor.execute(f"PUT file://{temp_file} @{stage_name}")
-            
-            # Copy data from stage to table
+            columns = ", ".join(f"${i}" for i in range(1, num_columns + 1))
             copy_query = f"""
             COPY INTO {schema}.{table_name}
-            FROM @{stage_name}
+            FROM (
+                SELECT
+                    {columns},
+                    {_sql_string(source_system)},
+                    {_sql_string(os.path.basename(local_path))},
+                    '{load_timestamp.isoformat(sep=' ')}'::TIMESTAMP_NTZ
+                FROM @{stage_name}
+            )
             FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY = '"' SKIP_HEADER = 1)
             ON_ERROR = 'CONTINUE'
             """
-            cursor.execute(copy_query)
+            self.execute_query(copy_query)
+            logger.info(f"Successfully loaded {local_path} to {schema}.{table_name}")
+        except Exception as e:
+            logger.error(f"Error loading {local_path} to {schema}.{table_name}: {e}")
+            raise
+    
+    def put_stream_to_stage(self, stream: io.BytesIO, file_name: str, stage: str) -> None:
+        """Upload an in-memory file to a stage without writing it to local disk"""
+        if not self.conn:
+            self.connect()
+        
+        cursor = self.conn.cursor()
+        try:
+            # The file:// path only names the staged file; the bytes come from file_stream
+            cursor.execute(f"PUT 'file://{file_name}' @{stage} AUTO_COMPRESS = FALSE", file_stream=stream)
+        finally:
+            cursor.close()
+    
+    def _copy_parquet_from_stage(self, stage: str, table_name: str, schema: str) -> None:
+        """COPY every Parquet file on a stage into a table, matching columns by name"""
+        copy_query = f"""
+        COPY INTO {schema}.{table_name}
+        FROM @{stage}
+        FILE_FORMAT = (TYPE = PARQUET USE_LOGICAL_TYPE = TRUE)
+        MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+        ON_ERROR = 'CONTINUE'
+        """
+        self.execute_query(copy_query)
+    
+    def load_parquet_dir_to_table(self, directory: str, table_name: str, schema: str) -> None:
+        """Upload all Parquet files in a directory with one PUT and COPY them into a table"""
+        if not self.conn:
+            self.connect()
+        
+        stage_name = f"{schema}.TEMP_STAGE_{table_name}"
+        self.execute_query(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
+        
+        cursor = self.conn.cursor()
+        try:
+            # A single wildcard PUT lets the connector encrypt and upload the files concurrently
+            cursor.execute(
+                f"PUT 'file://{directory}/*.parquet' @{stage_name} PARALLEL = 8 AUTO_COMPRESS = FALSE"
+            )
+        finally:
+            cursor.close()
+        
+        self._copy_parquet_from_stage(stage_name, table_name, schema)
+    
+    @staticmethod
+    def query_to_table_statements(select_sql: str, table_name: str, schema: str, stage: str) -> List[str]:
+        """Return the unload and COPY statements that load a SELECT into a table via a stage"""
+        path = f"@{stage}/{table_name.lower()}/"
+        unload_query = f"""
+        COPY INTO {path}
+        FROM ({select_sql})
+        FILE_FORMAT = (TYPE = PARQUET)
+        HEADER = TRUE
+        MAX_FILE_SIZE = 256000000
+        OVERWRITE = TRUE
+        """
+        copy_query = f"""
+        COPY INTO {schema}.{table_name}
+        FROM {path}
+        FILE_FORMAT = (TYPE = PARQUET USE_LOGICAL_TYPE = TRUE)
+        MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+        PURGE = TRUE
+        """
+        return [unload_query, copy_query]
+    
+    def resize_warehouse_query(self, size: str) -> str:
+        """Return the statement that resizes the configured warehouse and waits until it is ready"""
+        return f"ALTER WAREHOUSE {self.config['warehouse']} SET WAREHOUSE_SIZE = '{size}' WAIT_FOR_COMPLETION = TRUE"
+    
+    def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, schema: str) -> None:
+        """Load a pandas DataFrame to a Snowflake table"""
+        if not self.conn:
+            self.connect()
+        
+        try:
+            stage_name = f"{schema}.TEMP_STAGE_{table_name}"
+            self.execute_query(f"CREATE OR REPLACE TEMPORARY STAGE {stage_name}")
+            
+            # Upload typed Parquet rather than CSV so numbers and timestamps are not
+            # stringified on the client and re-parsed by Snowflake. Each chunk is
+            # serialized into memory and streamed to the stage, so nothing touches /tmp.
+            chunk_rows = self._rows_per_chunk(df)
+            for i, start in enumerate(range(0, len(df), chunk_rows)):
+                buf = io.BytesIO()
+                _write_stage_parquet(df.iloc[start:start + chunk_rows], buf)
+                buf.seek(0)
+                self.put_stream_to_stage(buf, f"{table_name}_{i}.parquet", stage_name)
             
-            # Clean up
-            os.remove(temp_file)
-            logger.info(f"Successfully loaded data to {schema}.{table_name}")
+            self._copy_parquet_from_stage(stage_name, table_name, schema)
+            logger.info(f"Successfully loaded {len(df)} rows to {schema}.{table_name}")
         except Exception as e:
             logger.error(f"Error loading data to {schema}.{table_name}: {e}")
             raise
     
     def close(self) -> None:
         """Close the Snowflake connection"""
+        if self._cursor:
+            self._cursor.close()
+            self._cursor = None
         if self.conn:
             self.conn.close()
             logger.info("Snowflake connection closed")
@@ -166,88 +545,72 @@ class ETLPipeline:
             self.snowflake.execute_query(f"CREATE SCHEMA IF NOT EXISTS {schema}")
         logger.info("Created schemas successfully")
     
+    def _stream_load(
+        self, snowflake: SnowflakeConnector, key: str, stg_table: str, source_system: str, load_timestamp: datetime
+    ) -> None:
+        """Stream a raw CSV to a stage table one parsed block at a time"""
+        path = self.data_files[key]
+        column_types = {field.name: field.type for field in SCHEMAS.get(key, [])}
+        column_types.update({
+            column: pa.dictionary(pa.int32(), pa.string())
+            for column in CATEGORICAL_COLS.get(key, [])
+        })
+        # Memory-map the file so the parser reads pages straight from the OS page
+        # cache instead of copying them through a user-space read buffer
+        with pa.memory_map(path, "r") as source, tempfile.TemporaryDirectory() as tmp_dir:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=64 << 20, use_threads=True),
+                convert_options=pa_csv.ConvertOptions(column_types=column_types)
+            )
+            # Only one block is held in memory at a time; each is written to its
+            # own numbered file and the whole directory is uploaded in one PUT
+            for i, batch in enumerate(reader):
+                chunk = _tag(batch.to_pandas(types_mapper=pd.ArrowDtype), source_system, path, load_timestamp)
+                _write_stage_parquet(chunk, os.path.join(tmp_dir, f"{stg_table}_{i}.parquet"))
+            snowflake.load_parquet_dir_to_table(tmp_dir, stg_table, "STAGE_SCHEMA")
+        logger.info(f"Successfully loaded {path} to STAGE_SCHEMA.{stg_table}")
+    
+    def _load_one(self, key: str, stg_table: str, source_system: str, load_timestamp: datetime) -> None:
+        """Load a single raw file into its stage table on a dedicated connection"""
+        # Snowflake connections are not thread-safe, so each worker opens its own
+        snowflake = SnowflakeConnector(self.snowflake.config)
+        try:
+            if key not in DATAFRAME_STAGE_KEYS:
+                # Passthrough files are PUT as-is and tagged inside the COPY
+                snowflake.load_csv_file_to_table(
+                    self.data_files[key], stg_table, "STAGE_SCHEMA", source_system, load_timestamp
+                )
+                return
+            
+            self._stream_load(snowflake, key, stg_table, source_system, load_timestamp)
+        finally:
+            snowflake.close()
+    
     def load_stage_tables(self) -> None:
         """Load data from CSV files to stage tables"""
         logger.info("Starting data load to stage tables")
         
-        # Load restaurants data
-        restaurants_df = pd.read_csv(self.data_files["restaurants"])
-        # Add metadata columns
-        restaurants_df["source_system"] = "UberEats"
-        restaurants_df["source_file"] = os.path.basename(self.data_files["restaurants"])
-        restaurants_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            restaurants_df, "STG_RESTAURANTS", "STAGE_SCHEMA"
-        )
-        
-        # Load zomato data (additional restaurant data)
-        zomato_df = pd.read_csv(self.data_files["zomato"])
-        zomato_df["source_system"] = "Zomato"
-        zomato_df["source_file"] = os.path.basename(self.data_files["zomato"])
-        zomato_df["load_timestamp"] = datetime.now()
-        # Transform and load to stage table
-        # This would require mapping Zomato fields to the restaurant schema
+        # Read the clock once so every table of this batch shares one load_timestamp,
+        # taken from Snowflake so it is comparable with the dw_created_at columns
+        load_timestamp = self.snowflake.execute_query(
+            "SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ AS TS", fetch=True
+        )[0]['TS']
         
-        # Load products data
-        products_df = pd.read_csv(self.data_files["products"])
-        products_df["source_system"] = "Internal"
-        products_df["source_file"] = os.path.basename(self.data_files["products"])
-        products_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            products_df, "STG_PRODUCTS", "STAGE_SCHEMA"
-        )
-        
-        # Load promotions data
-        promotions_df = pd.read_csv(self.data_files["promotions"])
-        promotions_df["source_system"] = "Internal"
-        promotions_df["source_file"] = os.path.basename(self.data_files["promotions"])
-        promotions_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            promotions_df, "STG_PROMOTIONS", "STAGE_SCHEMA"
-        )
-        
-        # Load customers data
-        customers_df = pd.read_csv(self.data_files["customers"])
-        customers_df["source_system"] = "Internal"
-        customers_df["source_file"] = os.path.basename(self.data_files["customers"])
-        customers_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            customers_df, "STG_CUSTOMERS", "STAGE_SCHEMA"
-        )
-        
-        # Load orders data
-        orders_df = pd.read_csv(self.data_files["orders"])
-        orders_df["source_system"] = "Internal"
-        orders_df["source_file"] = os.path.basename(self.data_files["orders"])
-        orders_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            orders_df, "STG_ORDERS", "STAGE_SCHEMA"
-        )
+        # Zomato data (additional restaurant data) is not loaded yet: it would
+        # require mapping Zomato fields to the restaurant schema first
         
-        # Load order items data
-        order_items_df = pd.read_csv(self.data_files["order_items"])
-        order_items_df["source_system"] = "Internal"
-        order_items_df["source_file"] = os.path.basename(self.data_files["order_items"])
-        order_items_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            order_items_df, "STG_ORDER_ITEMS", "STAGE_SCHEMA"
-        )
-        
-        # Load delivery data
-        delivery_df = pd.read_csv(self.data_files["delivery"])
-        delivery_df["source_system"] = "Internal"
-        delivery_df["source_file"] = os.path.basename(self.data_files["delivery"])
-        delivery_df["load_timestamp"] = datetime.now()
-        self.snowflake.load_dataframe_to_table(
-            delivery_df, "STG_DELIVERY", "STAGE_SCHEMA"
-        )
+        # The tables are independent, so overlap their PUT/COPY round-trips
+        with ThreadPoolExecutor(max_workers=STAGE_LOAD_WORKERS) as executor:
+            futures = [executor.submit(self._load_one, *job, load_timestamp) for job in STAGE_TABLES]
+            # Re-raise the first failure once every load has finished
+            for future in futures:
+                future.result()
         
         logger.info("Completed data load to stage tables")
     
-    def transform_to_clean_layer(self) -> None:
-        """Transform data from stage to clean layer"""
-        logger.info("Starting transformation to clean layer")
-        
+    def _clean_transform_queries(self) -> Dict[str, str]:
+        """Return the stage-to-clean INSERT of every entity, keyed by entity"""
         # Transform restaurants data
         restaurant_transform_query = """
         INSERT INTO CLEAN_SCHEMA.CLEAN_RESTAURANTS (
@@ -295,8 +658,11 @@ class ETLPipeline:
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_RESTAURANTS
         WHERE loc_number IS NOT NULL
+        AND load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_RESTAURANTS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(restaurant_transform_query)
         
         # Transform products data
         product_transform_query = """
@@ -342,8 +708,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_PRODUCTS
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_PRODUCTS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(product_transform_query)
         
         # Transform promotions data
         promotion_transform_query = """
@@ -387,8 +756,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_PROMOTIONS
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_PROMOTIONS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(promotion_transform_query)
         
         # Transform customers data
         customer_transform_query = """
@@ -436,8 +808,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_CUSTOMERS
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_CUSTOMERS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(customer_transform_query)
         
         # Transform orders data
         order_transform_query = """
@@ -487,8 +862,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_ORDERS
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_ORDERS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(order_transform_query)
         
         # Transform order items data
         order_item_transform_query = """
@@ -518,8 +896,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_ORDER_ITEMS
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_ORDER_ITEMS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(order_item_transform_query)
         
         # Transform delivery data
         delivery_transform_query = """
@@ -532,6 +913,7 @@ class ETLPipeline:
             delivery_time,
             estimated_delivery_time,
             actual_delivery_time,
+            delivery_duration_minutes,
             delivery_distance,
             weather_conditions,
             traffic_density,
@@ -550,6 +932,8 @@ class ETLPipeline:
             Time_Order_picked AS delivery_time,
             NULL AS estimated_delivery_time,
             NULL AS actual_delivery_time,
+            -- Computed once here so fact loads copy it instead of re-deriving it
+            FLOOR(DATEDIFF(SECOND, Time_Orderd, Time_Order_picked) / 60) AS delivery_duration_minutes,
             NULL AS delivery_distance,
             Weatherconditions AS weather_conditions,
             Road_traffic_density AS traffic_density,
@@ -559,8 +943,11 @@ class ETLPipeline:
             source_system,
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_DELIVERY
+        WHERE load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_DELIVERY),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(delivery_transform_query)
         
         # Transform ratings data
         rating_transform_query = """
@@ -593,136 +980,198 @@ class ETLPipeline:
             CURRENT_TIMESTAMP() AS dw_created_at
         FROM STAGE_SCHEMA.STG_ORDERS o
         WHERE o.rating IS NOT NULL
+        AND o.load_timestamp > COALESCE(
+            (SELECT MAX(dw_created_at) FROM CLEAN_SCHEMA.CLEAN_RATINGS),
+            '1900-01-01'::TIMESTAMP_NTZ
+        )
         """
-        self.snowflake.execute_query(rating_transform_query)
         
-        logger.info("Completed transformation to clean layer")
+        # Every transform only reads stage rows loaded after the latest clean row,
+        # so re-runs scan the new micro-partitions instead of the whole table.
+        return {
+            "restaurants": restaurant_transform_query,
+            "products": product_transform_query,
+            "promotions": promotion_transform_query,
+            "customers": customer_transform_query,
+            "orders": order_transform_query,
+            "order_items": order_item_transform_query,
+            "delivery": delivery_transform_query,
+            "ratings": rating_transform_query
+        }
+    
+    def _build_date_dimension(self) -> pd.DataFrame:
+        """Build the rows of DIM_DATE with vectorized calendar attributes"""
+        dates = pd.Series(pd.date_range(DATE_DIMENSION_START, periods=DATE_DIMENSION_DAYS, freq="D"))
+        # Snowflake's DAYOFWEEK numbers Sunday as 0, pandas numbers Monday as 0
+        day_of_week = (dates.dt.dayofweek + 1) % 7
+        return pd.DataFrame({
+            # Smart key YYYYMMDD, so fact loads compute it from the timestamp without a join
+            "date_sk": dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day,
+            "date_id": dates.dt.date,
+            "day_of_week": day_of_week,
+            "day_of_week_name": dates.dt.day_name().str[:3],
+            "day_of_month": dates.dt.day,
+            "day_of_year": dates.dt.dayofyear,
+            "week_of_year": dates.dt.isocalendar().week.astype(int),
+            "month_number": dates.dt.month,
+            "month_name": dates.dt.month_name().str[:3],
+            "quarter": dates.dt.quarter,
+            "year": dates.dt.year,
+            "is_weekend": np.where(dates.dt.dayofweek >= 5, True, False),
+            "is_holiday": False,  # Would need a holiday calendar to populate
+            "holiday_name": None,
+            "fiscal_year": dates.dt.year,  # Assuming calendar year = fiscal year
+            "fiscal_quarter": dates.dt.quarter
+        })
+    
+    def _build_time_dimension(self) -> pd.DataFrame:
+        """Build the rows of DIM_TIME at one-minute grain"""
+        times = pd.Series(pd.date_range("00:00", "23:59", freq="1min"))
+        # Derived labels are computed in single passes over a compact int8 array
+        hours = times.dt.hour.to_numpy(dtype=np.int8)
+        return pd.DataFrame({
+            # Smart key HHMM00 (minute grain), so fact loads compute it from the timestamp without a join
+            "time_sk": times.dt.hour * 10000 + times.dt.minute * 100 + times.dt.second,
+            "time_id": times.dt.time,
+            "hour_of_day": hours,
+            "minute_of_hour": times.dt.minute,
+            "second_of_minute": times.dt.second,
+            "am_pm": np.where(hours < 12, "AM", "PM"),
+            "time_of_day_category": np.where(
+                hours < 5, "Night",
+                np.where(hours < 12, "Morning",
+                         np.where(hours < 17, "Afternoon",
+                                  np.where(hours < 21, "Evening", "Night")))
+            )
+        })
     
-    def populate_dimension_tables(self) -> None:
-        """Populate dimension tables with SCD2 logic"""
-        logger.info("Starting dimension table population with SCD2 logic")
+    def _table_is_empty(self, table_name: str) -> bool:
+        """Return True if a table has no rows"""
+        return not self.snowflake.execute_query(
+            f"SELECT COUNT(*) AS C FROM {table_name}", fetch=True
+        )[0]['C']
+    
+    def populate_calendar_dimensions(self) -> None:
+        """Populate DIM_DATE and DIM_TIME if they are empty"""
+        # The date and time dimensions are static, so they are generated once on
+        # the client and skipped on later runs
+        if self._table_is_empty("CONSUMPTION_SCHEMA.DIM_DATE"):
+            self.snowflake.load_dataframe_to_table(
+                self._build_date_dimension(), "DIM_DATE", "CONSUMPTION_SCHEMA"
+            )
         
-        # Populate date dimension
-        date_dimension_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.DIM_DATE (
-            date_sk,
-            date_id,
-            day_of_week,
-            day_of_week_name,
-            day_of_month,
-            day_of_year,
-            week_of_year,
-            month_number,
-            month_name,
-            quarter,
-            year,
-            is_weekend,
-            is_holiday,
-            holiday_name,
-            fiscal_year,
-            fiscal_quarter
-        )
-        WITH date_range AS (
-            SELECT DATEADD(DAY, seq, '2020-01-01'::DATE) AS date_id
-            FROM TABLE(GENERATOR(ROWCOUNT => 1825)) -- 5 years of dates
-        )
-        SELECT
-            ROW_NUMBER() OVER (ORDER BY date_id) AS date_sk,
-            date_id,
-            DAYOFWEEK(date_id) AS day_of_week,
-            DAYNAME(date_id) AS day_of_week_name,
-            DAYOFMONTH(date_id) AS day_of_month,
-            DAYOFYEAR(date_id) AS day_of_year,
-            WEEKOFYEAR(date_id) AS week_of_year,
-            MONTH(date_id) AS month_number,
-            MONTHNAME(date_id) AS month_name,
-            QUARTER(date_id) AS quarter,
-            YEAR(date_id) AS year,
-            CASE WHEN DAYOFWEEK(date_id) IN (0, 6) THEN TRUE ELSE FALSE END AS is_weekend,
-            FALSE AS is_holiday, -- Would need a holiday calendar to populate
-            NULL AS holiday_name,
-            YEAR(date_id) AS fiscal_year, -- Assuming calendar year = fiscal year
-            QUARTER(date_id) AS fiscal_quarter
-        FROM date_range
+        if self._table_is_empty("CONSUMPTION_SCHEMA.DIM_TIME"):
+            self.snowflake.load_dataframe_to_table(
+                self._build_time_dimension(), "DIM_TIME", "CONSUMPTION_SCHEMA"
+            )
+    
+    def _restaurant_dimension_queries(self) -> List[str]:
+        """Return the statements that apply new CLEAN_RESTAURANTS rows to DIM_RESTAURANT"""
+        # Track new rows in CLEAN_RESTAURANTS so each run only merges the delta;
+        # SHOW_INITIAL_ROWS makes the first run pick up the existing rows too
+        restaurant_stream_query = """
+        CREATE STREAM IF NOT EXISTS CLEAN_SCHEMA.STRM_CLEAN_RESTAURANTS
+        ON TABLE CLEAN_SCHEMA.CLEAN_RESTAURANTS
+        SHOW_INITIAL_ROWS = TRUE
         """
-        self.snowflake.execute_query(date_dimension_query)
         
-        # Populate time dimension
-        time_dimension_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.DIM_TIME (
-            time_sk,
-            time_id,
-            hour_of_day,
-            minute_of_hour,
-            second_of_minute,
-            am_pm,
-            time_of_day_category
-        )
-        WITH time_range AS (
-            SELECT TIMEADD(SECOND, seq, '00:00:00'::TIME) AS time_id
-            FROM TABLE(GENERATOR(ROWCOUNT => 86400)) -- Seconds in a day
-            WHERE MOD(seq, 60) = 0 -- Every minute
+        # Initial load: there is no history to expire, so every restaurant gets its
+        # first version through a plain bulk INSERT instead of MERGE match probing.
+        # Reading the stream still consumes it, so later runs only see the delta.
+        restaurant_initial_query = """
+        INSERT INTO CONSUMPTION_SCHEMA.DIM_RESTAURANT (
+            restaurant_id,
+            restaurant_name,
+            cuisine_type,
+            address,
+            city,
+            state,
+            country,
+            postal_code,
+            latitude,
+            longitude,
+            phone_number,
+            email,
+            operating_hours,
+            created_at,
+            updated_at,
+            effective_from,
+            effective_to,
+            is_current,
+            source_system,
+            dw_created_at
         )
         SELECT
-            ROW_NUMBER() OVER (ORDER BY time_id) AS time_sk,
-            time_id,
-            HOUR(time_id) AS hour_of_day,
-            MINUTE(time_id) AS minute_of_hour,
-            SECOND(time_id) AS second_of_minute,
-            CASE WHEN HOUR(time_id) < 12 THEN 'AM' ELSE 'PM' END AS am_pm,
-            CASE
-                WHEN HOUR(time_id) BETWEEN 5 AND 11 THEN 'Morning'
-                WHEN HOUR(time_id) BETWEEN 12 AND 16 THEN 'Afternoon'
-                WHEN HOUR(time_id) BETWEEN 17 AND 20 THEN 'Evening'
-                ELSE 'Night'
-            END AS time_of_day_category
-        FROM time_range
+            restaurant_id,
+            restaurant_name,
+            cuisine_type,
+            address,
+            city,
+            state,
+            country,
+            postal_code,
+            latitude,
+            longitude,
+            phone_number,
+            email,
+            operating_hours,
+            created_at,
+            updated_at,
+            CURRENT_TIMESTAMP(),
+            NULL,
+            TRUE,
+            source_system,
+            CURRENT_TIMESTAMP()
+        FROM CLEAN_SCHEMA.STRM_CLEAN_RESTAURANTS
+        WHERE METADATA$ACTION = 'INSERT'
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY restaurant_id ORDER BY dw_created_at DESC) = 1
         """
-        self.snowflake.execute_query(time_dimension_query)
         
-        # Populate restaurant dimension with SCD2
+        # Populate restaurant dimension with SCD2 in a single MERGE. Changed rows
+        # appear twice in the source: once keyed on restaurant_id to expire the
+        # current version, and once with a NULL merge key so the new version is
+        # inserted. Changes are detected by comparing the row_hash fingerprint
+        # column that both tables compute over the tracked attributes.
         restaurant_dimension_query = """
         MERGE INTO CONSUMPTION_SCHEMA.DIM_RESTAURANT target
         USING (
-            SELECT 
-                restaurant_sk,
-                restaurant_id,
-                restaurant_name,
-                cuisine_type,
-                address,
-                city,
-                state,
-                country,
-                postal_code,
-                latitude,
-                longitude,
-                phone_number,
-                email,
-                operating_hours,
-                created_at,
-                updated_at,
-                effective_from,
-                effective_to,
-                is_current,
-                source_system,
-                dw_created_at
-            FROM CLEAN_SCHEMA.CLEAN_RESTAURANTS
+            WITH changes AS (
+                SELECT
+                    restaurant_id,
+                    restaurant_name,
+                    cuisine_type,
+                    address,
+                    city,
+                    state,
+                    country,
+                    postal_code,
+                    latitude,
+                    longitude,
+                    phone_number,
+                    email,
+                    operating_hours,
+                    created_at,
+                    updated_at,
+                    source_system,
+                    row_hash
+                FROM CLEAN_SCHEMA.STRM_CLEAN_RESTAURANTS
+                WHERE METADATA$ACTION = 'INSERT'
+                -- Only the latest change of each restaurant in the delta is applied,
+                -- so no target row is matched by more than one source row
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY restaurant_id ORDER BY dw_created_at DESC) = 1
+            )
+            SELECT changes.restaurant_id AS merge_key, changes.*
+            FROM changes
+            UNION ALL
+            SELECT NULL AS merge_key, changes.*
+            FROM changes
+            JOIN CONSUMPTION_SCHEMA.DIM_RESTAURANT current_row
+                ON current_row.restaurant_id = changes.restaurant_id
+                AND current_row.is_current = TRUE
+            WHERE current_row.row_hash != changes.row_hash
         ) source
-        ON target.restaurant_id = source.restaurant_id AND target.is_current = TRUE
-        WHEN MATCHED AND (
-            target.restaurant_name != source.restaurant_name OR
-            target.cuisine_type != source.cuisine_type OR
-            target.address != source.address OR
-            target.city != source.city OR
-            target.state != source.state OR
-            target.country != source.country OR
-            target.postal_code != source.postal_code OR
-            target.latitude != source.latitude OR
-            target.longitude != source.longitude OR
-            target.phone_number != source.phone_number OR
-            target.email != source.email OR
-            target.operating_hours != source.operating_hours
-        ) THEN
+        ON target.restaurant_id = source.merge_key AND target.is_current = TRUE
+        WHEN MATCHED AND target.row_hash != source.row_hash THEN
             UPDATE SET
                 effective_to = CURRENT_TIMESTAMP(),
                 is_current = FALSE
@@ -772,107 +1221,65 @@ class ETLPipeline:
                 CURRENT_TIMESTAMP()
             )
         """
-        self.snowflake.execute_query(restaurant_dimension_query)
-        
-        # Insert new records for updated rows
-        restaurant_insert_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.DIM_RESTAURANT (
-            restaurant_id,
-            restaurant_name,
-            cuisine_type,
-            address,
-            city,
-            state,
-            country,
-            postal_code,
-            latitude,
-            longitude,
-            phone_number,
-            email,
-            operating_hours,
-            created_at,
-            updated_at,
-            effective_from,
-            effective_to,
-            is_current,
-            source_system,
-            dw_created_at
-        )
-        SELECT
-            source.restaurant_id,
-            source.restaurant_name,
-            source.cuisine_type,
-            source.address,
-            source.city,
-            source.state,
-            source.country,
-            source.postal_code,
-            source.latitude,
-            source.longitude,
-            source.phone_number,
-            source.email,
-            source.operating_hours,
-            source.created_at,
-            source.updated_at,
-            CURRENT_TIMESTAMP(),
-            NULL,
-            TRUE,
-            source.source_system,
-            CURRENT_TIMESTAMP()
-        FROM CLEAN_SCHEMA.CLEAN_RESTAURANTS source
-        JOIN CONSUMPTION_SCHEMA.DIM_RESTAURANT target
-            ON target.restaurant_id = source.restaurant_id
-            AND target.is_current = FALSE
-            AND target.effective_to = CURRENT_TIMESTAMP()
+        # The choice is made when the task runs, not when the graph is created, so
+        # re-running the graph after the first load merges instead of re-inserting
+        restaurant_load_block = f"""
+        IF (dim_rows = 0) THEN
+            {restaurant_initial_query.strip()};
+        ELSE
+            {restaurant_dimension_query.strip()};
+        END IF
         """
-        self.snowflake.execute_query(restaurant_insert_query)
-        
-        # Similar SCD2 implementation for other dimension tables
-        # DIM_PRODUCT
-        # DIM_PROMOTION
-        # DIM_CUSTOMER
-        # DIM_DELIVERY_PERSON
-        
-        logger.info("Completed dimension table population with SCD2 logic")
+        return [
+            restaurant_stream_query,
+            "LET dim_rows INTEGER := 0",
+            "SELECT COUNT(*) INTO :dim_rows FROM CONSUMPTION_SCHEMA.DIM_RESTAURANT",
+            restaurant_load_block
+        ]
     
-    def populate_fact_tables(self) -> None:
-        """Populate fact tables"""
-        logger.info("Starting fact table population")
-        
-        # Populate FACT_ORDER
-        fact_order_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.FACT_ORDER (
-            order_sk,
-            order_id,
-            customer_sk,
-            restaurant_sk,
-            order_date_sk,
-            order_time_sk,
-            promotion_sk,
-            order_status,
-            delivery_address,
-            delivery_city,
-            delivery_state,
-            delivery_postal_code,
-            delivery_latitude,
-            delivery_longitude,
-            order_total,
-            tax_amount,
-            tip_amount,
-            payment_method,
-            payment_status,
-            created_at,
-            updated_at,
-            source_system,
-            dw_created_at
-        )
+    def _order_facts_query(self) -> str:
+        """Return the multi-table INSERT that populates FACT_ORDER and FACT_ORDER_ITEM together"""
+        # CLEAN_ORDERS already carries order_sk, so both facts are written from one pass
+        # over the orders joined to their items: every joined row becomes an item row,
+        # and the first row of each order (or its only row, if it has no items) becomes
+        # the order row. Date and time keys are computed from the timestamps (YYYYMMDD
+        # and HHMM00, matching the one-minute grain of DIM_TIME), and dimensions are
+        # pre-projected to their current (business key, surrogate key) pairs.
+        return f"""
+        INSERT ALL
+            WHEN item_seq = 1 THEN
+                INTO CONSUMPTION_SCHEMA.FACT_ORDER (
+                    order_sk, order_id, customer_sk, restaurant_sk, order_date_sk, order_time_sk,
+                    promotion_sk, order_status, delivery_address, delivery_city, delivery_state,
+                    delivery_postal_code, delivery_latitude, delivery_longitude, order_total,
+                    tax_amount, tip_amount, payment_method, payment_status, created_at,
+                    updated_at, source_system, dw_created_at
+                )
+                VALUES (
+                    order_sk, order_id, customer_sk, restaurant_sk, order_date_sk, order_time_sk,
+                    promotion_sk, order_status, delivery_address, delivery_city, delivery_state,
+                    delivery_postal_code, delivery_latitude, delivery_longitude, order_total,
+                    tax_amount, tip_amount, payment_method, payment_status, created_at,
+                    updated_at, source_system, dw_created_at
+                )
+            WHEN order_item_id IS NOT NULL THEN
+                INTO CONSUMPTION_SCHEMA.FACT_ORDER_ITEM (
+                    order_item_sk, order_item_id, order_sk, product_sk, quantity, unit_price,
+                    item_total, special_instructions, created_at, updated_at, source_system,
+                    dw_created_at
+                )
+                VALUES (
+                    order_item_sk, order_item_id, order_sk, product_sk, quantity, unit_price,
+                    item_total, special_instructions, item_created_at, item_updated_at,
+                    item_source_system, dw_created_at
+                )
         SELECT
             o.order_sk,
             o.order_id,
             c.customer_sk,
             r.restaurant_sk,
-            d.date_sk AS order_date_sk,
-            t.time_sk AS order_time_sk,
+            TO_NUMBER(TO_CHAR(o.order_date, 'YYYYMMDD')) AS order_date_sk,
+            HOUR(o.order_date) * 10000 + MINUTE(o.order_date) * 100 AS order_time_sk,
             p.promotion_sk,
             o.order_status,
             o.delivery_address,
@@ -889,80 +1296,70 @@ class ETLPipeline:
             o.created_at,
             o.updated_at,
             o.source_system,
-            CURRENT_TIMESTAMP() AS dw_created_at
-        FROM CLEAN_SCHEMA.CLEAN_ORDERS o
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_CUSTOMER c
-            ON o.customer_id = c.customer_id AND c.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_RESTAURANT r
-            ON o.restaurant_id = r.restaurant_id AND r.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DATE d
-            ON DATE(o.order_date) = d.date_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_TIME t
-            ON TIME(o.order_date) = t.time_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_PROMOTION p
-            ON o.promotion_id = p.promotion_id AND p.is_current = TRUE
-        """
-        self.snowflake.execute_query(fact_order_query)
-        
-        # Populate FACT_ORDER_ITEM
-        fact_order_item_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.FACT_ORDER_ITEM (
-            order_item_sk,
-            order_item_id,
-            order_sk,
-            product_sk,
-            quantity,
-            unit_price,
-            item_total,
-            special_instructions,
-            created_at,
-            updated_at,
-            source_system,
-            dw_created_at
-        )
-        SELECT
             oi.order_item_sk,
             oi.order_item_id,
-            o.order_sk,
-            p.product_sk,
+            pr.product_sk,
             oi.quantity,
             oi.unit_price,
             oi.item_total,
             oi.special_instructions,
-            oi.created_at,
-            oi.updated_at,
-            oi.source_system,
-            CURRENT_TIMESTAMP() AS dw_created_at
-        FROM CLEAN_SCHEMA.CLEAN_ORDER_ITEMS oi
-        JOIN CONSUMPTION_SCHEMA.FACT_ORDER o
+            oi.created_at AS item_created_at,
+            oi.updated_at AS item_updated_at,
+            oi.source_system AS item_source_system,
+            ROW_NUMBER() OVER (PARTITION BY o.order_sk ORDER BY oi.order_item_id) AS item_seq,
+            {PIPELINE_RUN_TIMESTAMP} AS dw_created_at
+        FROM CLEAN_SCHEMA.CLEAN_ORDERS o
+        LEFT JOIN (
+            SELECT customer_id, customer_sk
+            FROM CONSUMPTION_SCHEMA.DIM_CUSTOMER
+            WHERE is_current = TRUE
+        ) c ON o.customer_id = c.customer_id
+        LEFT JOIN (
+            SELECT restaurant_id, restaurant_sk
+            FROM CONSUMPTION_SCHEMA.DIM_RESTAURANT
+            WHERE is_current = TRUE
+        ) r ON o.restaurant_id = r.restaurant_id
+        LEFT JOIN (
+            SELECT promotion_id, promotion_sk
+            FROM CONSUMPTION_SCHEMA.DIM_PROMOTION
+            WHERE is_current = TRUE
+        ) p ON o.promotion_id = p.promotion_id
+        LEFT JOIN CLEAN_SCHEMA.CLEAN_ORDER_ITEMS oi
             ON oi.order_id = o.order_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_PRODUCT p
-            ON oi.product_id = p.product_id AND p.is_current = TRUE
+        LEFT JOIN (
+            SELECT product_id, product_sk
+            FROM CONSUMPTION_SCHEMA.DIM_PRODUCT
+            WHERE is_current = TRUE
+        ) pr ON oi.product_id = pr.product_id
+        """
+    
+    def _order_sk_map_query(self) -> str:
+        """Return the statement that materializes the order_id -> order_sk map of FACT_ORDER"""
+        return f"""
+        CREATE OR REPLACE TRANSIENT TABLE {ORDER_SK_MAP}
+        CLUSTER BY (order_id)
+        AS
+        SELECT order_id, order_sk
+        FROM CONSUMPTION_SCHEMA.FACT_ORDER
         """
-        self.snowflake.execute_query(fact_order_item_query)
+    
+    def _fact_queries(self) -> Dict[str, str]:
+        """Return the SELECT that builds each fact table loaded after FACT_ORDER"""
+        # Each fact SELECT is unloaded to Parquet on a stage and bulk-loaded with COPY,
+        # so the column aliases below must match the fact table column names. Date and
+        # time keys are computed from the timestamps (YYYYMMDD and HHMM00, matching the
+        # one-minute grain of DIM_TIME) instead of joining DIM_DATE/DIM_TIME. Dimensions
+        # are pre-projected to their current (business key, surrogate key) pairs, and
+        # order_sk is looked up in the ORDER_SK_MAP built after FACT_ORDER, so only
+        # those columns are scanned and the join hash tables stay small.
         
         # Populate FACT_DELIVERY
-        fact_delivery_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.FACT_DELIVERY (
-            delivery_sk,
-            delivery_id,
-            order_sk,
-            delivery_person_sk,
-            delivery_status,
-            pickup_date_sk,
-            pickup_time_sk,
-            delivery_date_sk,
-            delivery_time_sk,
-            estimated_delivery_time,
-            actual_delivery_time,
-            delivery_duration_minutes,
-            delivery_distance,
-            weather_conditions,
-            traffic_density,
-            created_at,
-            updated_at,
-            source_system,
-            dw_created_at
+        fact_delivery_query = f"""
+        WITH
+        dp AS (
+            SELECT delivery_person_id, delivery_person_sk
+            FROM CONSUMPTION_SCHEMA.DIM_DELIVERY_PERSON
+            WHERE is_current = TRUE
         )
         SELECT
             d.delivery_sk,
@@ -970,54 +1367,42 @@ class ETLPipeline:
             o.order_sk,
             dp.delivery_person_sk,
             d.delivery_status,
-            pd.date_sk AS pickup_date_sk,
-            pt.time_sk AS pickup_time_sk,
-            dd.date_sk AS delivery_date_sk,
-            dt.time_sk AS delivery_time_sk,
+            TO_NUMBER(TO_CHAR(d.pickup_time, 'YYYYMMDD')) AS pickup_date_sk,
+            HOUR(d.pickup_time) * 10000 + MINUTE(d.pickup_time) * 100 AS pickup_time_sk,
+            TO_NUMBER(TO_CHAR(d.delivery_time, 'YYYYMMDD')) AS delivery_date_sk,
+            HOUR(d.delivery_time) * 10000 + MINUTE(d.delivery_time) * 100 AS delivery_time_sk,
             d.estimated_delivery_time,
             d.actual_delivery_time,
-            DATEDIFF(MINUTE, d.pickup_time, d.delivery_time) AS delivery_duration_minutes,
+            d.delivery_duration_minutes,
             d.delivery_distance,
             d.weather_conditions,
             d.traffic_density,
             d.created_at,
             d.updated_at,
             d.source_system,
-            CURRENT_TIMESTAMP() AS dw_created_at
+            {PIPELINE_RUN_TIMESTAMP} AS dw_created_at
         FROM CLEAN_SCHEMA.CLEAN_DELIVERY d
-        LEFT JOIN CONSUMPTION_SCHEMA.FACT_ORDER o
-            ON d.order_id = o.order_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DELIVERY_PERSON dp
-            ON d.delivery_person_id = dp.delivery_person_id AND dp.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DATE pd
-            ON DATE(d.pickup_time) = pd.date_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_TIME pt
-            ON TIME(d.pickup_time) = pt.time_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DATE dd
-            ON DATE(d.delivery_time) = dd.date_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_TIME dt
-            ON TIME(d.delivery_time) = dt.time_id
+        LEFT JOIN {ORDER_SK_MAP} o ON d.order_id = o.order_id
+        LEFT JOIN dp ON d.delivery_person_id = dp.delivery_person_id
         """
-        self.snowflake.execute_query(fact_delivery_query)
         
         # Populate FACT_RATING
-        fact_rating_query = """
-        INSERT INTO CONSUMPTION_SCHEMA.FACT_RATING (
-            rating_sk,
-            rating_id,
-            order_sk,
-            customer_sk,
-            restaurant_sk,
-            delivery_person_sk,
-            rating_date_sk,
-            rating_time_sk,
-            food_rating,
-            delivery_rating,
-            overall_rating,
-            comments,
-            created_at,
-            source_system,
-            dw_created_at
+        fact_rating_query = f"""
+        WITH
+        c AS (
+            SELECT customer_id, customer_sk
+            FROM CONSUMPTION_SCHEMA.DIM_CUSTOMER
+            WHERE is_current = TRUE
+        ),
+        res AS (
+            SELECT restaurant_id, restaurant_sk
+            FROM CONSUMPTION_SCHEMA.DIM_RESTAURANT
+            WHERE is_current = TRUE
+        ),
+        dp AS (
+            SELECT delivery_person_id, delivery_person_sk
+            FROM CONSUMPTION_SCHEMA.DIM_DELIVERY_PERSON
+            WHERE is_current = TRUE
         )
         SELECT
             r.rating_sk,
@@ -1026,32 +1411,264 @@ class ETLPipeline:
             c.customer_sk,
             res.restaurant_sk,
             dp.delivery_person_sk,
-            d.date_sk AS rating_date_sk,
-            t.time_sk AS rating_time_sk,
+            TO_NUMBER(TO_CHAR(r.created_at, 'YYYYMMDD')) AS rating_date_sk,
+            HOUR(r.created_at) * 10000 + MINUTE(r.created_at) * 100 AS rating_time_sk,
             r.food_rating,
             r.delivery_rating,
             r.overall_rating,
             r.comments,
             r.created_at,
             r.source_system,
-            CURRENT_TIMESTAMP() AS dw_created_at
+            {PIPELINE_RUN_TIMESTAMP} AS dw_created_at
         FROM CLEAN_SCHEMA.CLEAN_RATINGS r
-        LEFT JOIN CONSUMPTION_SCHEMA.FACT_ORDER o
-            ON r.order_id = o.order_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_CUSTOMER c
-            ON r.customer_id = c.customer_id AND c.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_RESTAURANT res
-            ON r.restaurant_id = res.restaurant_id AND res.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DELIVERY_PERSON dp
-            ON r.delivery_person_id = dp.delivery_person_id AND dp.is_current = TRUE
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_DATE d
-            ON DATE(r.created_at) = d.date_id
-        LEFT JOIN CONSUMPTION_SCHEMA.DIM_TIME t
-            ON TIME(r.created_at) = t.time_id
+        LEFT JOIN {ORDER_SK_MAP} o ON r.order_id = o.order_id
+        LEFT JOIN c ON r.customer_id = c.customer_id
+        LEFT JOIN res ON r.restaurant_id = res.restaurant_id
+        LEFT JOIN dp ON r.delivery_person_id = dp.delivery_person_id
+        """
+        
+        return {
+            "FACT_DELIVERY": fact_delivery_query,
+            "FACT_RATING": fact_rating_query
+        }
+    
+    def _task_ddl(self, name: str, statements: List[str], after: List[str], finalize: bool = False) -> str:
+        """Return the CREATE TASK statement for one node of the pipeline task graph
+        
+        A finalize task runs once the rest of the graph is done, whether or not it succeeded.
+        """
+        if len(statements) == 1:
+            body = statements[0]
+        else:
+            # Several statements run in order inside one Snowflake Scripting block
+            body = "EXECUTE IMMEDIATE $$\nBEGIN\n" + "".join(f"{q.strip()};\n" for q in statements) + "END;\n$$"
+        predecessors = ""
+        if finalize:
+            predecessors = f"\n        FINALIZE = {PIPELINE_ROOT_TASK}"
+        elif after:
+            predecessors = "\n        AFTER " + ", ".join(f"{PIPELINE_TASK_SCHEMA}.{task}" for task in after)
+        return f"""
+        CREATE OR REPLACE TASK {PIPELINE_TASK_SCHEMA}.{name}
+            WAREHOUSE = {self.snowflake.config["warehouse"]}
+            USER_TASK_TIMEOUT_MS = {STATEMENT_TIMEOUT_SECONDS * 1000}{predecessors}
+        AS
+        {body}
+        """
+    
+    def _pipeline_tasks(self) -> Dict[str, Any]:
+        """Return the body statements and predecessors of every task of the pipeline graph but the finalizer"""
+        # The root only prepares shared objects. Stage loading stays on the client
+        # because PUT needs the local files, so the root has no schedule and is run
+        # with EXECUTE TASK once the upload has finished.
+        tasks = {"ETL_ROOT": ([f"CREATE STAGE IF NOT EXISTS {FACT_STAGE}"], [])}
+        for entity, query in self._clean_transform_queries().items():
+            tasks[f"ETL_CLEAN_{entity.upper()}"] = ([query], ["ETL_ROOT"])
+        tasks["ETL_DIM_RESTAURANT"] = (self._restaurant_dimension_queries(), ["ETL_CLEAN_RESTAURANTS"])
+        
+        # FACT_ORDER (written together with FACT_ORDER_ITEM) waits for its inputs;
+        # the other facts fan out after it
+        tasks["ETL_FACT_ORDER"] = (
+            [self._order_facts_query(), self._order_sk_map_query()],
+            ["ETL_CLEAN_ORDERS", "ETL_CLEAN_ORDER_ITEMS", "ETL_DIM_RESTAURANT"]
+        )
+        fact_inputs = {
+            "FACT_DELIVERY": ["ETL_FACT_ORDER", "ETL_CLEAN_DELIVERY"],
+            "FACT_RATING": ["ETL_FACT_ORDER", "ETL_CLEAN_RATINGS"]
+        }
+        # Task sessions do not share session variables, so every fact task stamps its
+        # rows with the run timestamp of the graph instead
+        for table_name, query in self._fact_queries().items():
+            tasks[f"ETL_{table_name}"] = (
+                SnowflakeConnector.query_to_table_statements(query, table_name, "CONSUMPTION_SCHEMA", FACT_STAGE),
+                fact_inputs[table_name]
+            )
+        
+        # The warehouse is scaled up before the first fact load, and the finalizer
+        # drops the order_sk map and scales it back down even when a task of the graph fails
+        tasks["ETL_FACT_ORDER"][0].insert(0, self.snowflake.resize_warehouse_query(FACT_LOAD_WAREHOUSE_SIZE))
+        return tasks
+    
+    def create_pipeline_dag(self) -> None:
+        """Create the task graph that runs the clean, dimension and fact phases in Snowflake"""
+        logger.info("Creating pipeline task graph")
+        
+        tasks = self._pipeline_tasks()
+        finalizer = self._task_ddl(
+            "ETL_FINALIZE",
+            [f"DROP TABLE IF EXISTS {ORDER_SK_MAP}", self.snowflake.resize_warehouse_query(DEFAULT_WAREHOUSE_SIZE)],
+            [],
+            finalize=True
+        )
+        
+        # Tasks in a graph can only be replaced while the root is suspended; the
+        # children are resumed so a run of the root cascades through them
+        statements = [f"ALTER TASK IF EXISTS {PIPELINE_ROOT_TASK} SUSPEND"]
+        # FACT_ORDER_ITEM used to have its own task, which would load the items twice
+        statements.append(f"DROP TASK IF EXISTS {PIPELINE_TASK_SCHEMA}.ETL_FACT_ORDER_ITEM")
+        statements += [self._task_ddl(name, body, after) for name, (body, after) in tasks.items()]
+        statements.append(finalizer)
+        statements += [
+            f"ALTER TASK {PIPELINE_TASK_SCHEMA}.{name} RESUME"
+            for name in [*tasks, "ETL_FINALIZE"] if name != "ETL_ROOT"
+        ]
+        self.snowflake.execute_script(";\n".join(statements))
+        
+        logger.info("Created pipeline task graph")
+    
+    def run_pipeline_dag(self) -> None:
+        """Run the pipeline task graph once and wait until the run has finished"""
+        # The trigger time is kept as a session variable so the run is told apart
+        # from earlier runs of the same graph
+        self.snowflake.execute_query("SET etl_triggered_at = CURRENT_TIMESTAMP()")
+        self.snowflake.execute_query(f"EXECUTE TASK {PIPELINE_ROOT_TASK}")
+        logger.info("Triggered pipeline task graph")
+        
+        # A graph run is only listed here once every task, the finalizer included, is done
+        status_query = f"""
+        SELECT state, first_error_task_name, first_error_message
+        FROM TABLE(INFORMATION_SCHEMA.COMPLETE_TASK_GRAPHS(
+            ROOT_TASK_NAME => '{PIPELINE_ROOT_TASK.split('.')[-1]}'
+        ))
+        WHERE schema_name = '{PIPELINE_TASK_SCHEMA}'
+        AND scheduled_from = 'EXECUTE TASK'
+        AND scheduled_time >= $etl_triggered_at
+        ORDER BY scheduled_time DESC
+        LIMIT 1
         """
-        self.snowflake.execute_query(fact_rating_query)
+        # Even run one after another, the tasks and the finalizer cannot outlast their
+        # summed USER_TASK_TIMEOUT_MS, so a run still unlisted after that never started
+        # or is not matched by the query above
+        timeout = (len(self._pipeline_tasks()) + 1) * STATEMENT_TIMEOUT_SECONDS + PIPELINE_TIMEOUT_MARGIN_SECONDS
+        deadline = time.monotonic() + timeout
+        while True:
+            runs = self.snowflake.execute_query(status_query, fetch=True)
+            if runs:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Pipeline task graph run not completed after {timeout}s")
+            time.sleep(PIPELINE_POLL_INTERVAL_SECONDS)
+        
+        run = runs[0]
+        if run['STATE'] != 'SUCCEEDED':
+            raise RuntimeError(
+                f"Pipeline task graph {run['STATE'].lower()}: "
+                f"{run['FIRST_ERROR_TASK_NAME']}: {run['FIRST_ERROR_MESSAGE']}"
+            )
+        logger.info("Pipeline task graph completed")
+    
+    def _scd2_stream_task_ddl(self, spec: Dict[str, Any]) -> str:
+        """Return the CREATE TASK statement that applies one entity's stage stream to its SCD2 tables"""
+        entity = spec["entity"]
+        key = spec["business_key"]
+        delta_table = f"STAGE_SCHEMA.{entity.upper()}_DELTA"
+        names = [name for name, _, _ in spec["columns"]]
+        tracked = [name for name in names if name != key]
         
-        logger.info("Completed fact table population")
+        def column_list(prefix: str = "") -> str:
+            return ",\n".join(f"                {prefix}{name}" for name in names)
+        
+        delta_columns = ",\n".join(f"                {name} {sql_type}" for name, sql_type, _ in spec["columns"])
+        stream_columns = ",\n".join(f"                {expression}" for _, _, expression in spec["columns"])
+        scd2_columns = """
+                created_at,
+                updated_at,
+                effective_from,
+                effective_to,
+                is_current,
+                source_system,
+                dw_created_at"""
+        delta_hash = ", ".join(f"delta.{name}" for name in tracked)
+        
+        return f"""
+        -- Create task to process {entity} stream
+        CREATE OR REPLACE TASK STAGE_SCHEMA.PROCESS_{entity.upper()}_STREAM
+            WAREHOUSE = ETL_WH
+            SCHEDULE = 'USING CRON 0 */4 * * * UTC'
+        WHEN
+            SYSTEM$STREAM_HAS_DATA('{spec["stream"]}')
+        AS
+        EXECUTE IMMEDIATE $$
+        DECLARE
+            -- One timestamp for every row this run writes
+            dw_ts TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP();
+        BEGIN
+            -- The stream delta is read exactly once into a session snapshot, and every
+            -- later statement reads the snapshot. The snapshot table is created before
+            -- the transaction because DDL would commit it.
+            CREATE OR REPLACE TEMPORARY TABLE {delta_table} (
+{delta_columns},
+                source_system VARCHAR,
+                load_timestamp TIMESTAMP_NTZ
+            );
+            
+            -- The stream offset only advances when this transaction commits, so a
+            -- failed run leaves the delta in the stream for the next one
+            BEGIN TRANSACTION;
+            
+            INSERT INTO {delta_table}
+            SELECT
+{stream_columns},
+                source_system,
+                load_timestamp
+            FROM {spec["stream"]}
+            WHERE METADATA$ACTION = 'INSERT';
+            
+            -- Process changes to clean layer
+            INSERT INTO {spec["clean_table"]} (
+{column_list()},{scd2_columns}
+            )
+            SELECT
+{column_list()},
+                :dw_ts AS created_at,
+                :dw_ts AS updated_at,
+                :dw_ts AS effective_from,
+                NULL AS effective_to,
+                TRUE AS is_current,
+                source_system,
+                :dw_ts AS dw_created_at
+            FROM {delta_table};
+            
+            -- Expire the current version of every {entity} whose attributes changed
+            -- in the delta
+            MERGE INTO {spec["dim_table"]} target
+            USING (
+                SELECT *
+                FROM {delta_table}
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY load_timestamp DESC) = 1
+            ) delta
+            ON target.{key} = delta.{key} AND target.is_current = TRUE
+            -- One NULL-safe fingerprint compare against the row_hash virtual column,
+            -- hashing the same attributes in the same order and types
+            WHEN MATCHED AND target.row_hash != HASH({delta_hash}) THEN
+                UPDATE SET
+                    effective_to = :dw_ts,
+                    is_current = FALSE;
+            
+            -- Insert a current version for new {entity} rows and for the ones just
+            -- expired, i.e. every delta row that no longer has a current version
+            INSERT INTO {spec["dim_table"]} (
+{column_list()},{scd2_columns}
+            )
+            SELECT
+{column_list("delta.")},
+                :dw_ts,
+                :dw_ts,
+                :dw_ts,
+                NULL,
+                TRUE,
+                delta.source_system,
+                :dw_ts
+            FROM {delta_table} delta
+            LEFT JOIN {spec["dim_table"]} target
+                ON target.{key} = delta.{key}
+                AND target.is_current = TRUE
+            WHERE target.{key} IS NULL
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY delta.{key} ORDER BY delta.load_timestamp DESC) = 1;
+            
+            COMMIT;
+        END;
+        $$
+        """
     
     def setup_incremental_loads(self) -> None:
         """Set up Snowflake streams and tasks for incremental loads"""
@@ -1069,7 +1686,9 @@ class ETLPipeline:
         CREATE OR REPLACE STREAM STAGE_SCHEMA.DELIVERY_STREAM ON TABLE STAGE_SCHEMA.STG_DELIVERY;
         CREATE OR REPLACE STREAM STAGE_SCHEMA.RATING_STREAM ON TABLE STAGE_SCHEMA.STG_RATINGS;
         """
-        self.snowflake.execute_query(streams_query)
+        # Both scripts are sent as a single multi-statement request each, so the server
+        # runs every statement in one round trip
+        self.snowflake.execute_script(streams_query)
         
         # Create tasks to process streams
         tasks_query = """
@@ -1078,217 +1697,21 @@ class ETLPipeline:
             WAREHOUSE_SIZE = 'XSMALL'
             AUTO_SUSPEND = 60
             AUTO_RESUME = TRUE;
-            
-        -- Create task to process restaurant stream
-        CREATE OR REPLACE TASK STAGE_SCHEMA.PROCESS_RESTAURANT_STREAM
-            WAREHOUSE = ETL_WH
-            SCHEDULE = 'USING CRON 0 */4 * * * UTC'
-        WHEN
-            SYSTEM$STREAM_HAS_DATA('STAGE_SCHEMA.RESTAURANT_STREAM')
-        AS
-        BEGIN
-            -- Process changes to clean layer
-            INSERT INTO CLEAN_SCHEMA.CLEAN_RESTAURANTS (
-                restaurant_id,
-                restaurant_name,
-                cuisine_type,
-                address,
-                city,
-                state,
-                country,
-                postal_code,
-                latitude,
-                longitude,
-                phone_number,
-                email,
-                operating_hours,
-                created_at,
-                updated_at,
-                effective_from,
-                effective_to,
-                is_current,
-                source_system,
-                dw_created_at
-            )
-            SELECT
-                loc_number AS restaurant_id,
-                loc_name AS restaurant_name,
-                cuisines AS cuisine_type,
-                address,
-                searched_city AS city,
-                searched_state AS state,
-                'USA' AS country,
-                searched_zipcode AS postal_code,
-                latitude,
-                longitude,
-                phone AS phone_number,
-                NULL AS email,
-                NULL AS operating_hours,
-                CURRENT_TIMESTAMP() AS created_at,
-                CURRENT_TIMESTAMP() AS updated_at,
-                CURRENT_TIMESTAMP() AS effective_from,
-                NULL AS effective_to,
-                TRUE AS is_current,
-                source_system,
-                CURRENT_TIMESTAMP() AS dw_created_at
-            FROM STAGE_SCHEMA.RESTAURANT_STREAM
-            WHERE METADATA$ACTION = 'INSERT';
-            
-            -- Apply SCD2 logic to dimension table
-            MERGE INTO CONSUMPTION_SCHEMA.DIM_RESTAURANT target
-            USING (
-                SELECT 
-                    restaurant_id,
-                    restaurant_name,
-                    cuisine_type,
-                    address,
-                    city,
-                    state,
-                    country,
-                    postal_code,
-                    latitude,
-                    longitude,
-                    phone_number,
-                    email,
-                    operating_hours,
-                    created_at,
-                    updated_at,
-                    effective_from,
-                    effective_to,
-                    is_current,
-                    source_system,
-                    dw_created_at
-                FROM CLEAN_SCHEMA.CLEAN_RESTAURANTS
-                WHERE effective_from >= (SELECT NVL(MAX(dw_created_at), '1900-01-01'::TIMESTAMP_NTZ) FROM CONSUMPTION_SCHEMA.DIM_RESTAURANT)
-            ) source
-            ON target.restaurant_id = source.restaurant_id AND target.is_current = TRUE
-            WHEN MATCHED AND (
-                target.restaurant_name != source.restaurant_name OR
-                target.cuisine_type != source.cuisine_type OR
-                target.address != source.address OR
-                target.city != source.city OR
-                target.state != source.state OR
-                target.country != source.country OR
-                target.postal_code != source.postal_code OR
-                target.latitude != source.latitude OR
-                target.longitude != source.longitude OR
-                target.phone_number != source.phone_number OR
-                target.email != source.email OR
-                target.operating_hours != source.operating_hours
-            ) THEN
-                UPDATE SET
-                    effective_to = CURRENT_TIMESTAMP(),
-                    is_current = FALSE
-            WHEN NOT MATCHED THEN
-                INSERT (
-                    restaurant_id,
-                    restaurant_name,
-                    cuisine_type,
-                    address,
-                    city,
-                    state,
-                    country,
-                    postal_code,
-                    latitude,
-                    longitude,
-                    phone_number,
-                    email,
-                    operating_hours,
-                    created_at,
-                    updated_at,
-                    effective_from,
-                    effective_to,
-                    is_current,
-                    source_system,
-                    dw_created_at
-                )
-                VALUES (
-                    source.restaurant_id,
-                    source.restaurant_name,
-                    source.cuisine_type,
-                    source.address,
-                    source.city,
-                    source.state,
-                    source.country,
-                    source.postal_code,
-                    source.latitude,
-                    source.longitude,
-                    source.phone_number,
-                    source.email,
-                    source.operating_hours,
-                    source.created_at,
-                    source.updated_at,
-                    CURRENT_TIMESTAMP(),
-                    NULL,
-                    TRUE,
-                    source.source_system,
-                    CURRENT_TIMESTAMP()
-                );
-                
-            -- Insert new records for updated rows
-            INSERT INTO CONSUMPTION_SCHEMA.DIM_RESTAURANT (
-                restaurant_id,
-                restaurant_name,
-                cuisine_type,
-                address,
-                city,
-                state,
-                country,
-                postal_code,
-                latitude,
-                longitude,
-                phone_number,
-                email,
-                operating_hours,
-                created_at,
-                updated_at,
-                effective_from,
-                effective_to,
-                is_current,
-                source_system,
-                dw_created_at
-            )
-            SELECT
-                source.restaurant_id,
-                source.restaurant_name,
-                source.cuisine_type,
-                source.address,
-                source.city,
-                source.state,
-                source.country,
-                source.postal_code,
-                source.latitude,
-                source.longitude,
-                source.phone_number,
-                source.email,
-                source.operating_hours,
-                source.created_at,
-                source.updated_at,
-                CURRENT_TIMESTAMP(),
-                NULL,
-                TRUE,
-                source.source_system,
-                CURRENT_TIMESTAMP()
-            FROM CLEAN_SCHEMA.CLEAN_RESTAURANTS source
-            JOIN CONSUMPTION_SCHEMA.DIM_RESTAURANT target
-                ON target.restaurant_id = source.restaurant_id
-                AND target.is_current = FALSE
-                AND target.effective_to = CURRENT_TIMESTAMP();
-        END;
+        """
         
-        -- Similar tasks for other entities
-        -- PROCESS_PRODUCT_STREAM
-        -- PROCESS_PROMOTION_STREAM
-        -- PROCESS_CUSTOMER_STREAM
-        -- PROCESS_ORDER_STREAM
-        -- PROCESS_ORDER_ITEM_STREAM
-        -- PROCESS_DELIVERY_STREAM
-        -- PROCESS_RATING_STREAM
+        # One task per SCD2 entity, all generated from the same template
+        task_names = [f"STAGE_SCHEMA.PROCESS_{spec['entity'].upper()}_STREAM" for spec in SCD2_STREAM_TASKS]
+        tasks_query += ";\n".join(self._scd2_stream_task_ddl(spec) for spec in SCD2_STREAM_TASKS) + ";\n"
         
-        -- Enable tasks
-        ALTER TASK STAGE_SCHEMA.PROCESS_RESTAURANT_STREAM RESUME;
-        """
-        self.snowflake.execute_query(tasks_query)
+        # Similar tasks for the fact entities
+        # PROCESS_ORDER_STREAM
+        # PROCESS_ORDER_ITEM_STREAM
+        # PROCESS_DELIVERY_STREAM
+        # PROCESS_RATING_STREAM
+        
+        # Enable tasks
+        tasks_query += ";\n".join(f"ALTER TASK {name} RESUME" for name in task_names)
+        self.snowflake.execute_script(tasks_query)
         
         logger.info("Completed setup for incremental loads")
     
@@ -1303,16 +1726,16 @@ class ETLPipeline:
             # Load data to stage tables
             self.load_stage_tables()
             
-            # Transform data to clean layer
-            self.transform_to_clean_layer()
-            
-            # Populate dimension tables with SCD2 logic
-            self.populate_dimension_tables()
+            # The static calendar dimensions are generated on the client
+            self.populate_calendar_dimensions()
             
-            # Populate fact tables
-            self.populate_fact_tables()
+            # Transform to the clean layer and populate dimensions and facts
+            # server-side as a task graph, without a client round trip per step
+            self.create_pipeline_dag()
+            self.run_pipeline_dag()
             
-            # Set up incremental loads
+            # Set up incremental loads only once the graph has stopped reading the
+            # stage tables, since replacing the streams resets their offsets
             self.setup_incremental_loads()
             
             logger.info("ETL pipeline completed successfully")
@@ -4,8 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import polars as pl
+import pyarrow.parquet as pq
 import os
 import json
+import time
 from datetime import datetime, timedelta
 import random
 
@@ -63,165 +66,325 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Function to load data
-@st.cache_data(ttl=3600)
-def load_data():
+# Random generator for the sample data; PCG64 is faster than the legacy global
+# RandomState, and the fixed seed keeps the sample dashboard reproducible
+rng = np.random.default_rng(0)
+
+# Directory holding the source files
+DATA_DIR = '/home/ubuntu/food_delivery_data'
+
+# Columns the dashboard uses from each source file; only these are read
+USED_COLUMNS = {
+    'UberEats_restaurants': ['loc_name', 'rating', 'cuisines', 'searched_city'],
+    'orders': ['created_at', 'updated_status', 'tips', 'rating'],
+    'delivery_data': ['Time_Orderd', 'Time_Order_picked', 'Weatherconditions', 'Road_traffic_density'],
+    'promotions': ['name', 'discount_type', 'discount_value', 'is_active']
+}
+
+# Low-cardinality string columns stored as categoricals, so counts, group-bys and
+# filter options work on small integer codes instead of hashing every string
+CATEGORY_COLUMNS = {
+    'UberEats_restaurants': ['cuisines', 'searched_city'],
+    'orders': ['updated_status'],
+    'delivery_data': ['Weatherconditions', 'Road_traffic_density', 'Type_of_vehicle']
+}
+
+# Narrower dtypes for numeric columns whose values fit, so every scan of them moves
+# a half to an eighth of the bytes
+NUMERIC_DTYPES = {
+    'UberEats_restaurants': {'loc_number': 'int32', 'rating': 'float32'},
+    'orders': {'id': 'int32', 'customer_id': 'int32', 'tips': 'float32', 'rating': 'float32'},
+    'delivery_data': {'ID': 'int32', 'multiple_deliveries': 'int8', 'delivery_time_minutes': 'float32'},
+    'promotions': {'promotion_id': 'int32', 'discount_value': 'int32', 'is_active': 'int8'}
+}
+
+def compact_dtypes(df, name):
+    """Store the low-cardinality strings of a source frame as categoricals and narrow its numbers"""
+    dtypes = {col: 'category' for col in CATEGORY_COLUMNS.get(name, []) if col in df.columns}
+    for col, dtype in NUMERIC_DTYPES[name].items():
+        if col not in df.columns:
+            continue
+        # Only columns already holding numbers of the right kind are narrowed
+        column_dtype = df[col].dtype
+        if dtype.startswith('int'):
+            fits = pd.api.types.is_integer_dtype(column_dtype)
+        else:
+            fits = pd.api.types.is_numeric_dtype(column_dtype)
+        if fits:
+            # Arrow-backed columns read from Parquet stay arrow-backed, and nullable
+            dtypes[col] = f"{dtype}[pyarrow]" if isinstance(column_dtype, pd.ArrowDtype) else dtype
+    return df.astype(dtypes)
+
+def sample_categories(categories, size):
+    """Draw a sample categorical column as integer codes into a sorted label table"""
+    categories = sorted(categories)
+    return pd.Categorical.from_codes(rng.integers(0, len(categories), size), categories=categories)
+
+def read_source(name):
     """
-    In a real implementation, this would connect to Snowflake and pull data.
-    For this demo, we'll simulate data based on our collected datasets.
+    Read the used columns of a source file from its Parquet copy.
+    The copies are written by convert_dashboard_data.py when the CSVs are deployed,
+    so cache misses read compressed columns instead of re-parsing the text files.
     """
-    # Load restaurant data
+    parquet_path = os.path.join(DATA_DIR, f"{name}.parquet")
+    
+    # Files lacking a column fall through to the sample values below, as with the CSVs
+    available = pq.read_schema(parquet_path).names
+    columns = [col for col in USED_COLUMNS[name] if col in available]
+    return pd.read_parquet(parquet_path, columns=columns, engine='pyarrow', dtype_backend='pyarrow')
+
+# Source loaders
+# Each file is cached on its own, so a change to one source only reloads that file.
+# cache_resource shares one copy of each frame across reruns and sessions instead of
+# pickling a fresh copy on every rerun, so the page must only read what they return.
+# Each loader also returns a version token, unique to that load, which the cached
+# aggregations are keyed on.
+@st.cache_resource(ttl=3600)
+def load_restaurants():
+    """Load restaurant data, or sample restaurants if the file is unavailable"""
     try:
-        restaurants_df = pd.read_csv('/home/ubuntu/food_delivery_data/UberEats_restaurants.csv')
-    except:
+        restaurants_df = read_source('UberEats_restaurants')
+    except FileNotFoundError:
         # Create sample data if file doesn't exist
         restaurants_df = pd.DataFrame({
             'loc_number': range(1, 101),
             'loc_name': [f"Restaurant {i}" for i in range(1, 101)],
-            'cuisines': np.random.choice(['Italian', 'Chinese', 'Indian', 'Mexican', 'American'], 100),
-            'searched_city': np.random.choice(['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix'], 100),
-            'rating': np.random.uniform(3.0, 5.0, 100).round(1)
+            'cuisines': sample_categories(['Italian', 'Chinese', 'Indian', 'Mexican', 'American'], 100),
+            'searched_city': sample_categories(['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix'], 100),
+            'rating': rng.uniform(3.0, 5.0, 100).round(1)
         })
     
-    # Load order data
+    return compact_dtypes(restaurants_df, 'UberEats_restaurants'), time.time_ns()
+
+@st.cache_resource(ttl=3600)
+def load_orders():
+    """Load order data, or sample orders if the file is unavailable"""
     try:
-        orders_df = pd.read_csv('/home/ubuntu/food_delivery_data/orders.csv')
-    except:
+        orders_df = read_source('orders')
+    except FileNotFoundError:
         # Create sample order data
+        # Sample columns are drawn as whole arrays rather than one Python call per row
+        now = np.datetime64(datetime.now(), 's')
         orders_df = pd.DataFrame({
             'id': range(1, 1001),
-            'customer_id': np.random.randint(1, 101, 1000),
-            'created_at': [datetime.now() - timedelta(days=np.random.randint(0, 90)) for _ in range(1000)],
-            'updated_status': np.random.choice(['Delivered', 'Cancelled', 'In Progress', 'Preparing'], 1000),
-            'tips': np.random.uniform(0, 15, 1000).round(2),
-            'rating': np.random.choice([None, 3, 4, 5], 1000, p=[0.2, 0.2, 0.3, 0.3])
+            'customer_id': rng.integers(1, 101, 1000),
+            'created_at': now - rng.integers(0, 90, 1000).astype('timedelta64[D]'),
+            'updated_status': sample_categories(['Delivered', 'Cancelled', 'In Progress', 'Preparing'], 1000),
+            'tips': rng.uniform(0, 15, 1000).round(2),
+            'rating': rng.choice([np.nan, 3, 4, 5], 1000, p=[0.2, 0.2, 0.3, 0.3])
         })
-        orders_df['created_at'] = pd.to_datetime(orders_df['created_at'])
     
-    # Load delivery data
+    orders_df = compact_dtypes(orders_df, 'orders')
+    if 'created_at' in orders_df.columns:
+        # Midnight of each order's day, kept as datetime64 rather than date objects
+        orders_df['date'] = pd.to_datetime(orders_df['created_at']).dt.normalize()
+    return orders_df, time.time_ns()
+
+@st.cache_resource(ttl=3600)
+def load_delivery():
+    """Load delivery data with a cleaned delivery_time_minutes, or sample deliveries"""
     try:
-        delivery_df = pd.read_csv('/home/ubuntu/food_delivery_data/delivery_data.csv')
-    except:
+        delivery_df = read_source('delivery_data')
+    except FileNotFoundError:
         # Create sample delivery data
+        # Categorical columns are drawn as codes, so no per-row label strings are built
+        now = np.datetime64(datetime.now(), 's')
         delivery_df = pd.DataFrame({
             'ID': range(1, 1001),
-            'Delivery_person_ID': [f"DRIVER{i:03d}" for i in range(1, 101)],
-            'Time_Orderd': [(datetime.now() - timedelta(hours=np.random.randint(1, 24))).strftime('%H:%M:%S') for _ in range(1000)],
-            'Time_Order_picked': [(datetime.now() - timedelta(minutes=np.random.randint(10, 60))).strftime('%H:%M:%S') for _ in range(1000)],
-            'Weatherconditions': np.random.choice(['Sunny', 'Cloudy', 'Foggy', 'Windy', 'Stormy', 'Sandstorms'], 1000),
-            'Road_traffic_density': np.random.choice(['Low', 'Medium', 'High', 'Jam'], 1000),
-            'Type_of_vehicle': np.random.choice(['motorcycle', 'scooter', 'electric_scooter'], 1000),
-            'Type_of_order': np.random.choice(['Snack', 'Meal', 'Drinks', 'Buffer'], 1000),
-            'multiple_deliveries': np.random.choice([0, 1, 2, 3], 1000, p=[0.7, 0.2, 0.07, 0.03])
+            'Delivery_person_ID': np.char.add('DRIVER', np.char.zfill(rng.integers(1, 101, 1000).astype(str), 3)),
+            # Kept as timestamps rather than formatted as HH:MM:SS strings
+            'Time_Orderd': now - rng.integers(1, 24, 1000).astype('timedelta64[h]'),
+            'Time_Order_picked': now - rng.integers(10, 60, 1000).astype('timedelta64[m]'),
+            'Weatherconditions': sample_categories(['Sunny', 'Cloudy', 'Foggy', 'Windy', 'Stormy', 'Sandstorms'], 1000),
+            'Road_traffic_density': sample_categories(['Low', 'Medium', 'High', 'Jam'], 1000),
+            'Type_of_vehicle': sample_categories(['motorcycle', 'scooter', 'electric_scooter'], 1000),
+            'Type_of_order': rng.choice(['Snack', 'Meal', 'Drinks', 'Buffer'], 1000),
+            'multiple_deliveries': rng.choice([0, 1, 2, 3], 1000, p=[0.7, 0.2, 0.07, 0.03])
         })
     
-    # Load promotions data
+    # Calculate delivery metrics
+    if 'Time_Orderd' in delivery_df.columns and 'Time_Order_picked' in delivery_df.columns:
+        # The times are HH:MM:SS strings; a fixed format parses them in one C pass,
+        # and cache=True parses each distinct string only once
+        delivery_df['Time_Orderd'] = pd.to_datetime(
+            delivery_df['Time_Orderd'], format='%H:%M:%S', errors='coerce', cache=True
+        )
+        delivery_df['Time_Order_picked'] = pd.to_datetime(
+            delivery_df['Time_Order_picked'], format='%H:%M:%S', errors='coerce', cache=True
+        )
+        
+        # Unparseable times give NaN durations, which are filled below
+        elapsed = delivery_df['Time_Order_picked'] - delivery_df['Time_Orderd']
+        minutes = elapsed.dt.total_seconds().to_numpy(dtype=float, na_value=np.nan) / 60
+    else:
+        # Without the times every duration is missing, and all of them are filled below
+        minutes = np.full(len(delivery_df), np.nan)
+    
+    # Ensure delivery times are positive and reasonable, filling missing ones with a
+    # random plausible value, in a few in-place passes over the float array
+    minutes = np.abs(minutes, out=minutes)
+    missing = np.isnan(minutes)
+    minutes[missing] = rng.uniform(15, 60, missing.sum())
+    delivery_df['delivery_time_minutes'] = np.clip(minutes, 5, 120, out=minutes)
+    
+    return compact_dtypes(delivery_df, 'delivery_data'), time.time_ns()
+
+@st.cache_resource(ttl=3600)
+def load_promotions():
+    """Load promotions data, or sample promotions if the file is unavailable"""
     try:
-        promotions_df = pd.read_csv('/home/ubuntu/food_delivery_data/promotions.csv')
-    except:
+        promotions_df = read_source('promotions')
+    except FileNotFoundError:
         # Create sample promotions data
         promotions_df = pd.DataFrame({
             'promotion_id': range(1, 16),
             'name': [f"Promo {i}" for i in range(1, 16)],
-            'discount_type': np.random.choice(['percentage', 'fixed', 'bogo'], 15),
-            'discount_value': np.random.choice([10, 15, 20, 25, 30, 50, 100], 15),
+            'discount_type': rng.choice(['percentage', 'fixed', 'bogo'], 15),
+            'discount_value': rng.choice([10, 15, 20, 25, 30, 50, 100], 15),
             'start_date': pd.date_range(start='2023-01-01', periods=15),
             'end_date': pd.date_range(start='2023-06-01', periods=15),
-            'is_active': np.random.choice([0, 1], 15, p=[0.2, 0.8])
+            'is_active': rng.choice([0, 1], 15, p=[0.2, 0.8])
         })
     
-    # Process data for dashboard
-    
-    # Order metrics by date
-    if 'created_at' in orders_df.columns:
-        orders_df['date'] = pd.to_datetime(orders_df['created_at']).dt.date
-        daily_orders = orders_df.groupby('date').size().reset_index(name='order_count')
-        daily_orders['date'] = pd.to_datetime(daily_orders['date'])
-        daily_orders = daily_orders.sort_values('date')
+    return compact_dtypes(promotions_df, 'promotions'), time.time_ns()
+
+# Aggregations for the dashboard
+# The source frames are shared cached objects, so instead of hashing their contents
+# they are passed as unhashed _arguments and the results are keyed on the version
+# token of the load that produced them; a reloaded source recomputes them.
+# Group-bys over many keys run in Polars on just the columns they need, and only the
+# small results are converted back to pandas for Plotly. Null keys are dropped, as
+# pandas does.
+# Filters are pushed into the aggregations: each takes the filter values that apply
+# to it, selects the matching rows before grouping, and is cached per filter value.
+def select_orders(orders_df, start_date, end_date):
+    """Orders placed from start_date to end_date, or all of them when no range is set"""
+    if start_date is None or 'date' not in orders_df.columns:
+        return orders_df
+    return orders_df[orders_df['date'].between(pd.Timestamp(start_date), pd.Timestamp(end_date))]
+
+def select_restaurants(restaurants_df, city, cuisine):
+    """Restaurants in the selected city and cuisine ('All' selects every value)"""
+    mask = np.ones(len(restaurants_df), dtype=bool)
+    for column, selected in (('searched_city', city), ('cuisines', cuisine)):
+        if selected != 'All' and column in restaurants_df.columns:
+            mask &= (restaurants_df[column] == selected).to_numpy(dtype=bool, na_value=False)
+    return restaurants_df[mask]
+
+def select_deliveries(delivery_df, weather):
+    """Deliveries made in the selected weather ('All' selects every delivery)"""
+    if weather == 'All' or 'Weatherconditions' not in delivery_df.columns:
+        return delivery_df
+    return delivery_df[delivery_df['Weatherconditions'] == weather]
+
+def mean_by(df, key, value):
+    """Mean of a column per key, sorted by key, from one factorize and two bincounts"""
+    # The keys are low-cardinality categoricals, so this is a histogram over small codes
+    codes, uniques = pd.factorize(df[key], sort=True)
+    valid = codes >= 0  # Missing keys are dropped, as groupby does
+    codes = codes[valid]
+    values = df[value].to_numpy(dtype=np.float64)[valid]
+    sums = np.bincount(codes, weights=values, minlength=len(uniques))
+    counts = np.bincount(codes, minlength=len(uniques))
+    return pd.DataFrame({key: uniques, value: sums / counts})
+
+@st.cache_data(ttl=3600)
+def daily_order_counts(version, _orders_df):
+    """Order metrics by date"""
+    if 'date' in _orders_df.columns:
+        daily_orders = (
+            pl.from_pandas(_orders_df[['date']])
+            .drop_nulls('date')
+            .group_by('date')
+            .len(name='order_count')
+            .sort('date')
+            .to_pandas()
+        )
     else:
         # Create sample daily orders data
         dates = pd.date_range(end=datetime.now(), periods=90)
         daily_orders = pd.DataFrame({
             'date': dates,
-            'order_count': np.random.randint(50, 200, size=90)
+            'order_count': rng.integers(50, 200, size=90)
         })
     
     # Add some trend to the data
     daily_orders['order_count'] = daily_orders['order_count'] + daily_orders.index * 0.5
+    return daily_orders
+
+@st.cache_data(ttl=3600)
+def top_rated_restaurants(version, _restaurants_df, city, cuisine):
+    """Restaurant performance"""
+    if 'loc_name' in _restaurants_df.columns and 'rating' in _restaurants_df.columns:
+        # A partial sort of the ratings, keeping only the columns the chart plots
+        restaurants_df = select_restaurants(_restaurants_df, city, cuisine)
+        return restaurants_df.nlargest(10, 'rating')[['loc_name', 'rating']]
     
-    # Calculate delivery metrics
-    if 'Time_Orderd' in delivery_df.columns and 'Time_Order_picked' in delivery_df.columns:
-        delivery_df['Time_Orderd'] = pd.to_datetime(delivery_df['Time_Orderd'], errors='coerce')
-        delivery_df['Time_Order_picked'] = pd.to_datetime(delivery_df['Time_Order_picked'], errors='coerce')
-        
-        # Handle potential parsing errors
-        valid_times = ~(delivery_df['Time_Orderd'].isna() | delivery_df['Time_Order_picked'].isna())
-        if valid_times.any():
-            delivery_df.loc[valid_times, 'delivery_time_minutes'] = (
-                (delivery_df.loc[valid_times, 'Time_Order_picked'] - 
-                 delivery_df.loc[valid_times, 'Time_Orderd']).dt.total_seconds() / 60
-            )
-        else:
-            delivery_df['delivery_time_minutes'] = np.random.uniform(15, 60, len(delivery_df))
-    else:
-        delivery_df['delivery_time_minutes'] = np.random.uniform(15, 60, len(delivery_df))
-    
-    # Ensure delivery times are positive and reasonable
-    delivery_df['delivery_time_minutes'] = delivery_df['delivery_time_minutes'].apply(
-        lambda x: abs(x) if isinstance(x, (int, float)) else np.random.uniform(15, 60)
-    )
-    delivery_df['delivery_time_minutes'] = delivery_df['delivery_time_minutes'].clip(5, 120)
-    
-    # Restaurant performance
-    if 'loc_name' in restaurants_df.columns and 'rating' in restaurants_df.columns:
-        top_restaurants = restaurants_df.sort_values('rating', ascending=False).head(10)
-    else:
-        # Create sample top restaurants
-        top_restaurants = pd.DataFrame({
-            'loc_name': [f"Top Restaurant {i}" for i in range(1, 11)],
-            'rating': np.random.uniform(4.0, 5.0, 10).round(1),
-            'cuisines': np.random.choice(['Italian', 'Chinese', 'Indian', 'Mexican', 'American'], 10)
-        })
-    
-    # Order status distribution
-    if 'updated_status' in orders_df.columns:
-        status_counts = orders_df['updated_status'].value_counts().reset_index()
-        status_counts.columns = ['status', 'count']
-    else:
-        # Create sample status distribution
-        status_counts = pd.DataFrame({
-            'status': ['Delivered', 'Cancelled', 'In Progress', 'Preparing'],
-            'count': [700, 100, 150, 50]
-        })
+    # Create sample top restaurants
+    return pd.DataFrame({
+        'loc_name': [f"Top Restaurant {i}" for i in range(1, 11)],
+        'rating': rng.uniform(4.0, 5.0, 10).round(1),
+        'cuisines': rng.choice(['Italian', 'Chinese', 'Indian', 'Mexican', 'American'], 10)
+    })
+
+@st.cache_data(ttl=3600)
+def status_distribution(version, _orders_df, start_date, end_date):
+    """Order status distribution"""
+    if 'updated_status' in _orders_df.columns:
+        orders_df = select_orders(_orders_df, start_date, end_date)
+        # A categorical count is a histogram over the integer codes; statuses with
+        # no orders in the selected range are dropped from the chart
+        status_counts = orders_df['updated_status'].value_counts()
+        return (
+            status_counts[status_counts > 0]
+            .rename_axis('status')
+            .reset_index(name='count')
+        )
     
-    # Weather impact on delivery
-    if 'Weatherconditions' in delivery_df.columns and 'delivery_time_minutes' in delivery_df.columns:
-        weather_impact = delivery_df.groupby('Weatherconditions')['delivery_time_minutes'].mean().reset_index()
-    else:
-        # Create sample weather impact data
-        weather_impact = pd.DataFrame({
-            'Weatherconditions': ['Sunny', 'Cloudy', 'Foggy', 'Windy', 'Stormy', 'Sandstorms'],
-            'delivery_time_minutes': [25, 30, 40, 35, 50, 55]
-        })
+    # Create sample status distribution
+    return pd.DataFrame({
+        'status': ['Delivered', 'Cancelled', 'In Progress', 'Preparing'],
+        'count': [700, 100, 150, 50]
+    })
+
+@st.cache_data(ttl=3600)
+def weather_delivery_impact(version, _delivery_df):
+    """Weather impact on delivery"""
+    if 'Weatherconditions' in _delivery_df.columns and 'delivery_time_minutes' in _delivery_df.columns:
+        return mean_by(_delivery_df, 'Weatherconditions', 'delivery_time_minutes')
     
-    # Traffic impact on delivery
-    if 'Road_traffic_density' in delivery_df.columns and 'delivery_time_minutes' in delivery_df.columns:
-        traffic_impact = delivery_df.groupby('Road_traffic_density')['delivery_time_minutes'].mean().reset_index()
-        # Ensure proper ordering
-        traffic_order = {'Low': 0, 'Medium': 1, 'High': 2, 'Jam': 3}
+    # Create sample weather impact data
+    return pd.DataFrame({
+        'Weatherconditions': ['Sunny', 'Cloudy', 'Foggy', 'Windy', 'Stormy', 'Sandstorms'],
+        'delivery_time_minutes': [25, 30, 40, 35, 50, 55]
+    })
+
+@st.cache_data(ttl=3600)
+def traffic_delivery_impact(version, _delivery_df, weather):
+    """Traffic impact on delivery"""
+    if 'Road_traffic_density' in _delivery_df.columns and 'delivery_time_minutes' in _delivery_df.columns:
+        traffic_impact = mean_by(select_deliveries(_delivery_df, weather), 'Road_traffic_density', 'delivery_time_minutes')
+        # Ensure proper ordering; an ordered categorical sorts on its codes
+        traffic_order = ['Low', 'Medium', 'High', 'Jam']
         if all(density in traffic_order for density in traffic_impact['Road_traffic_density']):
-            traffic_impact['order'] = traffic_impact['Road_traffic_density'].map(traffic_order)
-            traffic_impact = traffic_impact.sort_values('order').drop('order', axis=1)
-    else:
-        # Create sample traffic impact data
-        traffic_impact = pd.DataFrame({
-            'Road_traffic_density': ['Low', 'Medium', 'High', 'Jam'],
-            'delivery_time_minutes': [20, 30, 45, 60]
-        })
+            traffic_impact['Road_traffic_density'] = pd.Categorical(
+                traffic_impact['Road_traffic_density'], categories=traffic_order, ordered=True
+            )
+            traffic_impact = traffic_impact.sort_values('Road_traffic_density')
+        return traffic_impact
     
-    # Calculate key metrics
+    # Create sample traffic impact data
+    return pd.DataFrame({
+        'Road_traffic_density': ['Low', 'Medium', 'High', 'Jam'],
+        'delivery_time_minutes': [20, 30, 45, 60]
+    })
+
+@st.cache_data(ttl=3600)
+def key_metrics(version, _orders_df, _delivery_df, _daily_orders, start_date, end_date, weather):
+    """Calculate key metrics"""
+    orders_df = select_orders(_orders_df, start_date, end_date)
     total_orders = len(orders_df)
-    avg_delivery_time = delivery_df['delivery_time_minutes'].mean()
+    avg_delivery_time = select_deliveries(_delivery_df, weather)['delivery_time_minutes'].mean()
     if 'rating' in orders_df.columns:
         avg_rating = orders_df['rating'].dropna().mean()
     else:
@@ -232,18 +395,45 @@ def load_data():
     else:
         avg_tip = 3.5
     
-    # Calculate month-over-month growth
-    if 'date' in daily_orders.columns:
-        daily_orders['month'] = daily_orders['date'].dt.to_period('M')
-        monthly_orders = daily_orders.groupby('month')['order_count'].sum().reset_index()
-        if len(monthly_orders) >= 2:
-            current_month = monthly_orders.iloc[-1]['order_count']
-            previous_month = monthly_orders.iloc[-2]['order_count']
-            mom_growth = ((current_month - previous_month) / previous_month) * 100
-        else:
-            mom_growth = 5.7  # Default value
-    else:
-        mom_growth = 5.7  # Default value
+    # Calculate month-over-month growth over all orders; it is undefined (None) with
+    # fewer than two months of orders or after a month without any
+    monthly_growth = _daily_orders.set_index('date')['order_count'].resample('MS').sum().pct_change()
+    mom_growth = float(monthly_growth.iloc[-1] * 100) if len(monthly_growth) else np.nan
+    if not np.isfinite(mom_growth):
+        mom_growth = None
+    
+    return {
+        'total_orders': total_orders,
+        'avg_delivery_time': avg_delivery_time,
+        'avg_rating': avg_rating,
+        'avg_tip': avg_tip,
+        'mom_growth': mom_growth
+    }
+
+@st.cache_data(ttl=3600)
+def promotion_effectiveness(version, _promotions_df):
+    """Create a sample promotion effectiveness dataset"""
+    # In a real implementation, this would come from the Snowflake data warehouse
+    return pd.DataFrame({
+        'promotion_name': _promotions_df['name'],
+        'discount_type': _promotions_df['discount_type'],
+        'discount_value': _promotions_df['discount_value'],
+        'orders': rng.integers(50, 500, len(_promotions_df)),
+        'revenue': rng.uniform(1000, 10000, len(_promotions_df)).round(2),
+        'avg_order_value': rng.uniform(15, 50, len(_promotions_df)).round(2),
+        'is_active': _promotions_df['is_active']
+    })
+
+def load_data():
+    """
+    In a real implementation, this would connect to Snowflake and pull data.
+    For this demo, we'll simulate data based on our collected datasets.
+    """
+    restaurants_df, restaurants_version = load_restaurants()
+    orders_df, orders_version = load_orders()
+    delivery_df, delivery_version = load_delivery()
+    promotions_df, promotions_version = load_promotions()
+    daily_orders = daily_order_counts(orders_version, orders_df)
     
     return {
         'restaurants': restaurants_df,
@@ -251,19 +441,164 @@ def load_data():
         'delivery': delivery_df,
         'promotions': promotions_df,
         'daily_orders': daily_orders,
-        'top_restaurants': top_restaurants,
-        'status_counts': status_counts,
-        'weather_impact': weather_impact,
-        'traffic_impact': traffic_impact,
-        'metrics': {
-            'total_orders': total_orders,
-            'avg_delivery_time': avg_delivery_time,
-            'avg_rating': avg_rating,
-            'avg_tip': avg_tip,
-            'mom_growth': mom_growth
+        'weather_impact': weather_delivery_impact(delivery_version, delivery_df),
+        'promotion_effectiveness': promotion_effectiveness(promotions_version, promotions_df),
+        'versions': {
+            'restaurants': restaurants_version,
+            'orders': orders_version,
+            'delivery': delivery_version,
+            'promotions': promotions_version
         }
     }
 
+def filtered_data(data, start_date, end_date, city, cuisine, weather):
+    """Aggregate the loaded data with the sidebar filters applied before grouping"""
+    versions = data['versions']
+    return {
+        'top_restaurants': top_rated_restaurants(versions['restaurants'], data['restaurants'], city, cuisine),
+        'status_counts': status_distribution(versions['orders'], data['orders'], start_date, end_date),
+        'traffic_impact': traffic_delivery_impact(versions['delivery'], data['delivery'], weather),
+        'metrics': key_metrics(
+            (versions['orders'], versions['delivery']),
+            data['orders'], data['delivery'], data['daily_orders'], start_date, end_date, weather
+        )
+    }
+
+# Chart builders
+# Figures are cached on the version of the data they plot and the inputs that select
+# it (the data itself is passed as an unhashed _argument), so reruns from unrelated
+# widgets reuse them and a reloaded source redraws them.
+@st.cache_data(ttl=3600)
+def order_trend_chart(version, date_range, _filtered_daily_orders):
+    """Create a line chart for order trends"""
+    fig_orders = px.line(
+        _filtered_daily_orders, 
+        x='date', 
+        y='order_count',
+        title='Daily Order Volume',
+        labels={'date': 'Date', 'order_count': 'Number of Orders'},
+        template='plotly_white'
+    )
+    
+    fig_orders.update_layout(
+        height=400,
+        xaxis_title='Date',
+        yaxis_title='Number of Orders',
+        hovermode='x unified'
+    )
+    return fig_orders
+
+@st.cache_data(ttl=3600)
+def order_status_chart(version, date_range, _status_counts):
+    """Order status distribution"""
+    fig_status = px.pie(
+        _status_counts, 
+        values='count', 
+        names='status',
+        title='Order Status Distribution',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    
+    fig_status.update_layout(
+        height=350,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5)
+    )
+    return fig_status
+
+@st.cache_data(ttl=3600)
+def traffic_chart(version, weather, _traffic_impact):
+    """Delivery time by traffic conditions"""
+    fig_traffic = px.bar(
+        _traffic_impact,
+        x='Road_traffic_density',
+        y='delivery_time_minutes',
+        title='Delivery Time by Traffic Conditions',
+        labels={'Road_traffic_density': 'Traffic Density', 'delivery_time_minutes': 'Avg. Delivery Time (min)'},
+        color='delivery_time_minutes',
+        color_continuous_scale='Viridis'
+    )
+    
+    fig_traffic.update_layout(
+        height=350,
+        xaxis_title='Traffic Density',
+        yaxis_title='Avg. Delivery Time (min)'
+    )
+    return fig_traffic
+
+@st.cache_data(ttl=3600)
+def top_restaurants_chart(version, city, cuisine, _top_restaurants):
+    """Top restaurants by rating"""
+    fig_restaurants = px.bar(
+        _top_restaurants.head(10),
+        x='rating',
+        y='loc_name',
+        title='Top 10 Restaurants by Rating',
+        labels={'rating': 'Rating', 'loc_name': 'Restaurant'},
+        orientation='h',
+        color='rating',
+        color_continuous_scale='RdYlGn'
+    )
+    
+    fig_restaurants.update_layout(
+        height=400,
+        xaxis_title='Rating',
+        yaxis_title='Restaurant',
+        yaxis=dict(autorange="reversed")
+    )
+    return fig_restaurants
+
+@st.cache_data(ttl=3600)
+def weather_chart(version, _weather_impact):
+    """Weather impact on delivery time"""
+    fig_weather = px.bar(
+        _weather_impact,
+        x='Weatherconditions',
+        y='delivery_time_minutes',
+        title='Weather Impact on Delivery Time',
+        labels={'Weatherconditions': 'Weather Condition', 'delivery_time_minutes': 'Avg. Delivery Time (min)'},
+        color='delivery_time_minutes',
+        color_continuous_scale='Viridis'
+    )
+    
+    fig_weather.update_layout(
+        height=400,
+        xaxis_title='Weather Condition',
+        yaxis_title='Avg. Delivery Time (min)'
+    )
+    return fig_weather
+
+@st.cache_data(ttl=3600)
+def promotions_chart(version, _active_promotions):
+    """Create a horizontal bar chart for promotion effectiveness"""
+    fig_promotions = px.bar(
+        _active_promotions.sort_values('orders', ascending=True).tail(10),
+        x='orders',
+        y='promotion_name',
+        title='Top 10 Promotions by Order Volume',
+        labels={'orders': 'Number of Orders', 'promotion_name': 'Promotion'},
+        orientation='h',
+        color='discount_value',
+        color_continuous_scale='Viridis',
+        hover_data=['discount_type', 'discount_value', 'avg_order_value', 'revenue']
+    )
+    
+    fig_promotions.update_layout(
+        height=400,
+        xaxis_title='Number of Orders',
+        yaxis_title='Promotion',
+        yaxis=dict(autorange="reversed")
+    )
+    return fig_promotions
+
+def render_card(col, value, label, extra_class=''):
+    """Render a KPI card as one markdown element rather than one per line of HTML"""
+    col.markdown(
+        f"<div class='card'><div class='metric-value {extra_class}'>{value}</div>"
+        f"<div class='metric-label'>{label}</div></div>",
+        unsafe_allow_html=True
+    )
+
 # Load data
 data = load_data()
 
@@ -285,9 +620,9 @@ date_range = st.sidebar.date_input(
     max_value=max_date
 )
 
-# City filter
+# City filter (categories are already sorted and exclude missing values)
 if 'searched_city' in data['restaurants'].columns:
-    cities = ['All'] + sorted(data['restaurants']['searched_city'].unique().tolist())
+    cities = ['All'] + data['restaurants']['searched_city'].cat.categories.tolist()
 else:
     cities = ['All', 'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
 
@@ -295,7 +630,7 @@ selected_city = st.sidebar.selectbox("Select City", cities)
 
 # Cuisine filter
 if 'cuisines' in data['restaurants'].columns:
-    cuisines = ['All'] + sorted(data['restaurants']['cuisines'].unique().tolist())
+    cuisines = ['All'] + data['restaurants']['cuisines'].cat.categories.tolist()
 else:
     cuisines = ['All', 'Italian', 'Chinese', 'Indian', 'Mexican', 'American']
 
@@ -303,7 +638,7 @@ selected_cuisine = st.sidebar.selectbox("Select Cuisine", cuisines)
 
 # Weather conditions filter
 if 'Weatherconditions' in data['delivery'].columns:
-    weather_conditions = ['All'] + sorted(data['delivery']['Weatherconditions'].unique().tolist())
+    weather_conditions = ['All'] + data['delivery']['Weatherconditions'].cat.categories.tolist()
 else:
     weather_conditions = ['All', 'Sunny', 'Cloudy', 'Foggy', 'Windy', 'Stormy', 'Sandstorms']
 
@@ -311,208 +646,77 @@ selected_weather = st.sidebar.selectbox("Select Weather Condition", weather_cond
 
 # Apply filters to data
 # In a real implementation, these filters would be applied in the Snowflake query
-# For this demo, we'll filter the data after loading
+# For this demo, they are applied to the loaded rows before aggregating them
 
 # Filter daily orders by date
 if isinstance(date_range, tuple) and len(date_range) == 2:
     start_date, end_date = date_range
-    filtered_daily_orders = data['daily_orders'][
-        (data['daily_orders']['date'].dt.date >= start_date) & 
-        (data['daily_orders']['date'].dt.date <= end_date)
-    ]
+    # daily_orders is sorted by date, so the range bounds are found by binary search
+    lo, hi = data['daily_orders']['date'].searchsorted(
+        [pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    )
+    filtered_daily_orders = data['daily_orders'].iloc[lo:hi]
 else:
+    start_date, end_date = None, None
     filtered_daily_orders = data['daily_orders']
 
+filtered = filtered_data(data, start_date, end_date, selected_city, selected_cuisine, selected_weather)
+versions = data['versions']
+
 # Main dashboard content
 st.markdown("<div class='main-header'>Food Delivery Analytics Dashboard</div>", unsafe_allow_html=True)
 
 # Key metrics row
 st.markdown("<div class='sub-header'>Key Performance Indicators</div>", unsafe_allow_html=True)
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown(f"<div class='metric-value'>{data['metrics']['total_orders']:,}</div>", unsafe_allow_html=True)
-    st.markdown("<div class='metric-label'>Total Orders</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-with col2:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown(f"<div class='metric-value'>{data['metrics']['avg_delivery_time']:.1f} min</div>", unsafe_allow_html=True)
-    st.markdown("<div class='metric-label'>Avg. Delivery Time</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-with col3:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown(f"<div class='metric-value'>{data['metrics']['avg_rating']:.1f}⭐</div>", unsafe_allow_html=True)
-    st.markdown("<div class='metric-label'>Avg. Rating</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-with col4:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown(f"<div class='metric-value'>${data['metrics']['avg_tip']:.2f}</div>", unsafe_allow_html=True)
-    st.markdown("<div class='metric-label'>Avg. Tip Amount</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-with col5:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    growth_class = "trend-up" if data['metrics']['mom_growth'] >= 0 else "trend-down"
-    growth_symbol = "↑" if data['metrics']['mom_growth'] >= 0 else "↓"
-    st.markdown(
-        f"<div class='metric-value {growth_class}'>{abs(data['metrics']['mom_growth']):.1f}% {growth_symbol}</div>", 
-        unsafe_allow_html=True
-    )
-    st.markdown("<div class='metric-label'>Month-over-Month Growth</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+metrics = filtered['metrics']
+if metrics['mom_growth'] is None:
+    growth_value, growth_class = "n/a", ""
+else:
+    growth_symbol = "↑" if metrics['mom_growth'] >= 0 else "↓"
+    growth_value = f"{abs(metrics['mom_growth']):.1f}% {growth_symbol}"
+    growth_class = "trend-up" if metrics['mom_growth'] >= 0 else "trend-down"
+kpi_cards = [
+    ("Total Orders", f"{metrics['total_orders']:,}", ""),
+    ("Avg. Delivery Time", f"{metrics['avg_delivery_time']:.1f} min", ""),
+    ("Avg. Rating", f"{metrics['avg_rating']:.1f}⭐", ""),
+    ("Avg. Tip Amount", f"${metrics['avg_tip']:.2f}", ""),
+    ("Month-over-Month Growth", growth_value, growth_class)
+]
+
+for col, (label, value, value_class) in zip(st.columns(len(kpi_cards)), kpi_cards):
+    render_card(col, value, label, value_class)
 
 # Order trends chart
 st.markdown("<div class='sub-header'>Order Trends</div>", unsafe_allow_html=True)
-
-# Create a line chart for order trends
-fig_orders = px.line(
-    filtered_daily_orders, 
-    x='date', 
-    y='order_count',
-    title='Daily Order Volume',
-    labels={'date': 'Date', 'order_count': 'Number of Orders'},
-    template='plotly_white'
-)
-
-fig_orders.update_layout(
-    height=400,
-    xaxis_title='Date',
-    yaxis_title='Number of Orders',
-    hovermode='x unified'
-)
-
-st.plotly_chart(fig_orders, use_container_width=True)
+st.plotly_chart(order_trend_chart(versions['orders'], date_range, filtered_daily_orders), use_container_width=True)
 
 # Order flow and delivery metrics
 st.markdown("<div class='sub-header'>Order Flow & Delivery Metrics</div>", unsafe_allow_html=True)
 col1, col2 = st.columns(2)
 
 with col1:
-    # Order status distribution
-    fig_status = px.pie(
-        data['status_counts'], 
-        values='count', 
-        names='status',
-        title='Order Status Distribution',
-        hole=0.4,
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    
-    fig_status.update_layout(
-        height=350,
-        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5)
-    )
-    
-    st.plotly_chart(fig_status, use_container_width=True)
+    st.plotly_chart(order_status_chart(versions['orders'], date_range, filtered['status_counts']), use_container_width=True)
 
 with col2:
-    # Delivery time by traffic conditions
-    fig_traffic = px.bar(
-        data['traffic_impact'],
-        x='Road_traffic_density',
-        y='delivery_time_minutes',
-        title='Delivery Time by Traffic Conditions',
-        labels={'Road_traffic_density': 'Traffic Density', 'delivery_time_minutes': 'Avg. Delivery Time (min)'},
-        color='delivery_time_minutes',
-        color_continuous_scale='Viridis'
-    )
-    
-    fig_traffic.update_layout(
-        height=350,
-        xaxis_title='Traffic Density',
-        yaxis_title='Avg. Delivery Time (min)'
-    )
-    
-    st.plotly_chart(fig_traffic, use_container_width=True)
+    st.plotly_chart(traffic_chart(versions['delivery'], selected_weather, filtered['traffic_impact']), use_container_width=True)
 
 # Restaurant and weather analysis
 col1, col2 = st.columns(2)
 
 with col1:
-    # Top restaurants by rating
-    fig_restaurants = px.bar(
-        data['top_restaurants'].head(10),
-        x='rating',
-        y='loc_name',
-        title='Top 10 Restaurants by Rating',
-        labels={'rating': 'Rating', 'loc_name': 'Restaurant'},
-        orientation='h',
-        color='rating',
-        color_continuous_scale='RdYlGn'
-    )
-    
-    fig_restaurants.update_layout(
-        height=400,
-        xaxis_title='Rating',
-        yaxis_title='Restaurant',
-        yaxis=dict(autorange="reversed")
-    )
-    
-    st.plotly_chart(fig_restaurants, use_container_width=True)
+    st.plotly_chart(top_restaurants_chart(versions['restaurants'], selected_city, selected_cuisine, filtered['top_restaurants']), use_container_width=True)
 
 with col2:
-    # Weather impact on delivery time
-    fig_weather = px.bar(
-        data['weather_impact'],
-        x='Weatherconditions',
-        y='delivery_time_minutes',
-        title='Weather Impact on Delivery Time',
-        labels={'Weatherconditions': 'Weather Condition', 'delivery_time_minutes': 'Avg. Delivery Time (min)'},
-        color='delivery_time_minutes',
-        color_continuous_scale='Viridis'
-    )
-    
-    fig_weather.update_layout(
-        height=400,
-        xaxis_title='Weather Condition',
-        yaxis_title='Avg. Delivery Time (min)'
-    )
-    
-    st.plotly_chart(fig_weather, use_container_width=True)
+    st.plotly_chart(weather_chart(versions['delivery'], data['weather_impact']), use_container_width=True)
 
 # Promotions analysis
 st.markdown("<div class='sub-header'>Promotion Analysis</div>", unsafe_allow_html=True)
 
-# Create a sample promotion effectiveness dataset
-# In a real implementation, this would come from the Snowflake data warehouse
-promotion_effectiveness = pd.DataFrame({
-    'promotion_name': data['promotions']['name'],
-    'discount_type': data['promotions']['discount_type'],
-    'discount_value': data['promotions']['discount_value'],
-    'orders': np.random.randint(50, 500, len(data['promotions'])),
-    'revenue': np.random.uniform(1000, 10000, len(data['promotions'])).round(2),
-    'avg_order_value': np.random.uniform(15, 50, len(data['promotions'])).round(2),
-    'is_active': data['promotions']['is_active']
-})
-
 # Filter active promotions
+promotion_effectiveness = data['promotion_effectiveness']
 active_promotions = promotion_effectiveness[promotion_effectiveness['is_active'] == 1]
 
-# Create a horizontal bar chart for promotion effectiveness
-fig_promotions = px.bar(
-    active_promotions.sort_values('orders', ascending=True).tail(10),
-    x='orders',
-    y='promotion_name',
-    title='Top 10 Promotions by Order Volume',
-    labels={'orders': 'Number of Orders', 'promotion_name': 'Promotion'},
-    orientation='h',
-    color='discount_value',
-    color_continuous_scale='Viridis',
-    hover_data=['discount_type', 'discount_value', 'avg_order_value', 'revenue']
-)
-
-fig_promotions.update_layout(
-    height=400,
-    xaxis_title='Number of Orders',
-    yaxis_title='Promotion',
-    yaxis=dict(autorange="reversed")
-)
-
-st.plotly_chart(fig_promotions, use_container_width=True)
+st.plotly_chart(promotions_chart(versions['promotions'], active_promotions), use_container_width=True)
 
 # Footer
 st.markdown("<div class='footer'>Food Delivery Data Engineering Project - Powered by Snowflake & Streamlit</div>", unsafe_allow_html=True)